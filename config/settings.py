@@ -4,13 +4,48 @@ import os
 # 基础路径配置
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(BASE_DIR, 'data', 'temperature_data.csv')
+# 列式二进制存储目录（每列一个.npy文件），可直接赋给DATA_PATH使用
+COLUMNAR_DATA_PATH = os.path.join(BASE_DIR, 'data', 'temperature_data_columnar')
 OUTPUT_DIR = os.path.join(BASE_DIR, 'outputs')
 MATPLOT_OUTPUT = os.path.join(OUTPUT_DIR, 'matplotlib')
 PYECHARTS_OUTPUT = os.path.join(OUTPUT_DIR, 'pyecharts')
+# 预聚合立方等中间结果的缓存目录（按需创建）
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+# 生成图表后是否弹出窗口显示（批量渲染时工作进程强制关闭）
+SHOW_FIGURES = True
+# 流式聚合：为True时按块读取数据文件生成预聚合立方，图表不再加载完整数据框
+STREAMING = False
+STREAM_CHUNK_ROWS = 1_000_000
+# 输出缓存：数据指纹、完整配置与代码版本都未变化时跳过渲染（main.py的--force可临时关闭）
+OUTPUT_CACHE = True
+RENDER_CACHE_DIR = os.path.join(CACHE_DIR, 'renders')
+# 常驻渲染服务（src/daemon.py）的套接字路径与渲染线程数（None表示CPU核数）
+DAEMON_SOCKET = os.path.join(CACHE_DIR, 'render.sock')
+DAEMON_WORKERS = None
+# main.py生成PyEcharts图表时的数据写入方式（series/dataset/sidecar，见src/pyeplot/payload.py）
+PYE_DATA_ENCODING = "sidecar"
+
+# 数据类型策略（加载时与派生列统一使用紧凑类型，某项设为None表示保持原类型）
+DTYPE_POLICY = {
+    "float": "float32",  # 数值列与派生矩阵
+    "calendar": {  # 日历字段
+        "year": "int16",
+        "month": "int8",
+        "day": "int8",
+        "hour": "int8",
+        "dayofyear": "int16",
+        "weekday": "int8",
+        "week": "int8"
+    },
+    "category": True  # 字符串列（如站点编号）转换为分类类型
+}
+
+
+def ensure_output_dirs():
+    """创建图表输出目录（由入口脚本在渲染前调用，导入配置时不产生副作用）"""
+    os.makedirs(MATPLOT_OUTPUT, exist_ok=True)
+    os.makedirs(PYECHARTS_OUTPUT, exist_ok=True)
 
-# 创建必要目录
-os.makedirs(MATPLOT_OUTPUT, exist_ok=True)
-os.makedirs(PYECHARTS_OUTPUT, exist_ok=True)
 
 # 可视化配置
 PLOT_CONFIG = {
@@ -20,5 +55,3 @@ PLOT_CONFIG = {
     "font_size": 12,
     "dpi": 300
 }
-
-print(BASE_DIR)
@@ -3,6 +3,12 @@
 存放matplotlib/pyecharts等可视化工具的参数配置
 """
 
+# ========== Matplotlib 全局样式（首次创建画布时应用） ==========
+MATPLOT_RC_PARAMS = {
+    "font.sans-serif": ["SimHei"],  # 中文字体
+    "axes.unicode_minus": False  # 负号正常显示
+}
+
 # ========== Matplotlib 面积图默认配置 ==========
 MATPLOT_AREA_CONFIG = {
     "figure": {
@@ -87,12 +93,14 @@ MATPLOT_BOX_CONFIG = {
 MATPLOT_CALENDAR_CONFIG = {
     "figure": {
         "figsize": (24, 12),
-        "dpi": 300
+        "dpi": 300,
+        "panel_height": 4  # 多年份/多站点时每行日历的高度
     },
     "heatmap": {
         "cmap": "YlOrRd",
         "vmin": -10,
         "vmax": 40,
+        "aggregate": "mean",  # 每日取值：mean/min/max/range/count
         "show_date": True,
         "cbar_label": "温度 (°C)",
         "cbar_fontsize": 12,
@@ -102,7 +110,8 @@ MATPLOT_CALENDAR_CONFIG = {
         "month_fontsize": 12,
         "weekday_fontsize": 10,
         "date_fontsize": 6,
-        "date_color": "#333333"
+        "date_color": "#333333",
+        "title_fontsize": 14
     },
     "output": {
         "save_path": None,
@@ -247,6 +256,11 @@ PYE_CALENDAR_CONFIG = {
     "range_colors": ["#f0f9e8", "#bae4bc", "#7bccc4", "#43a2ca", "#0868ac"],
     "is_piecewise": True,
     "tooltip_formatter": "日期: {b}<br/>温度: {c}℃",
+    "aggregate": "mean",          # 每日取值：mean/min/max/range/count
+    "value_decimals": 1,
+    "raw_json_threshold": 20000,
+    "data_encoding": "series",      # 数据写入方式：series/dataset/sidecar（见src/pyeplot/payload.py）
+    "sidecar_dir": "data",          # sidecar数据文件目录（相对输出目录）
     "output_path": None,
     "filename": "pye_calendar_heatmap"
 }
@@ -276,6 +290,10 @@ PYE_HEATMAP_CONFIG = {
     "tooltip_formatter": "温度: {c} ℃<br/>X轴: {b}<br/>Y轴: {a}",
     "datazoom_range_start": 0,
     "datazoom_range_end": 100,
+    "value_decimals": 2,          # 热力数据保留的小数位数（None为不舍入）
+    "raw_json_threshold": 20000,  # 数据点超过该数量时直接写入JSON文本
+    "data_encoding": "series",      # 数据写入方式：series/dataset/sidecar（见src/pyeplot/payload.py）
+    "sidecar_dir": "data",          # sidecar数据文件目录（相对输出目录）
     "output_path": None,
     "filename": "pye_temperature_heatmap"
 }
@@ -307,6 +325,16 @@ PYE_LINE_CONFIG = {
     "date_format": "%Y-%m-%d",
     "datazoom_range_start": 0,
     "datazoom_range_end": 100,
+    "large_mode": "auto",           # 大数据模式：True/False/"auto"（数据点超过large_threshold时启用）
+    "large_threshold": 20000,
+    "sampling": "lttb",             # 大数据模式的降采样：lttb/average/min/max/minmax
+    "progressive": 5000,            # 大数据模式每帧渲染的点数
+    "progressive_threshold": 20000, # 数据点超过该数量时渐进渲染
+    "symbol_budget": 2000,          # 数据点超过该数量时不显示标记点
+    "value_decimals": 2,
+    "raw_json_threshold": 20000,
+    "data_encoding": "series",      # 数据写入方式：series/dataset/sidecar（见src/pyeplot/payload.py）
+    "sidecar_dir": "data",          # sidecar数据文件目录（相对输出目录）
     "output_path": None,
     "filename": "pye_temperature_line"
 }
@@ -332,6 +360,13 @@ PYE_3DSURFACE_CONFIG = {
     "visualmap_pos_left": "5%",
     "visualmap_pos_top": "center",
     "tooltip_formatter": "日期: {x}天<br/>时刻: {y}时<br/>温度: {z}℃",
+    "day_step": 1,                # 每个网格点合并的天数（块内取均值）
+    "hour_step": 1,               # 每个网格点合并的小时数
+    "max_points": 20000,          # 网格点数上限（超出时自动增大day_step，None为不限制）
+    "value_decimals": 1,
+    "raw_json_threshold": 20000,
+    "data_encoding": "series",      # 数据写入方式：series/dataset/sidecar（见src/pyeplot/payload.py）
+    "sidecar_dir": "data",          # sidecar数据文件目录（相对输出目录）
     "output_path": None,
     "filename": "3d_temperature_surface"
 }
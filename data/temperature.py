@@ -1,26 +1,227 @@
+import os
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
 
+# 采样频率到时间步长的映射
+FREQUENCIES = {
+    "hour": pd.Timedelta(hours=1),
+    "minute": pd.Timedelta(minutes=1)
+}
 
-def generate_temperature_data(seed=42):
+
+def generate_temperature_data(
+        seed=42,
+        start="2024-01-01",
+        end="2025-01-01",
+        freq="hour",
+        stations=1):
     """
-    生成模拟的365天*24小时温度数据
+    生成模拟温度数据（默认2024全年逐小时，闰年共8784小时）
     :param seed: 随机种子保证可重复性
+    :param start: 起始时间（包含）
+    :param end: 结束时间（不包含）
+    :param freq: 采样频率 hour/minute
+    :param stations: 站点数量，大于1时增加station列
     :return: 包含时间戳和温度的DataFrame
     """
-    np.random.seed(seed)
+    chunks = iter_temperature_chunks(start, end, freq, stations, seed)
+    return pd.concat(list(chunks), ignore_index=True)
+
+
+def iter_temperature_chunks(
+        start="2024-01-01",
+        end="2025-01-01",
+        freq="hour",
+        stations=1,
+        seed=42,
+        chunk_rows=1_000_000) -> Iterator[pd.DataFrame]:
+    """
+    按时间块逐块生成模拟温度数据，内存占用只与chunk_rows有关
+    块内按时间优先、站点其次排列，拼接后时间列单调不减；
+    每个(时间块, 站点)使用独立的随机数流，结果与生成顺序和进程数无关
+    :param chunk_rows: 每块的大致行数
+    :return: DataFrame迭代器
+    """
+    _, _, steps = _time_grid(start, end, freq)
+    for block in range(_block_count(steps, stations, chunk_rows)):
+        yield _generate_block(start, end, freq, stations, seed, chunk_rows, block)
+
+
+def write_temperature_data(
+        path,
+        fmt: Optional[str] = None,
+        start="2024-01-01",
+        end="2025-01-01",
+        freq="hour",
+        stations=1,
+        seed=42,
+        chunk_rows=1_000_000):
+    """
+    逐块生成模拟温度数据并写入磁盘（CSV追加写入或列式目录预分配写入）
+    :param path: 输出路径
+    :param fmt: 存储格式csv/columnar（默认按路径推断）
+    :return: 写入的总行数
+    """
+    from src.storage import ColumnarWriter, detect_format
+
+    _, _, steps = _time_grid(start, end, freq)
+    rows = steps * stations
+    chunks = iter_temperature_chunks(start, end, freq, stations, seed, chunk_rows)
+
+    if detect_format(path, fmt) == "csv":
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        return rows
+
+    schema, categories = _columnar_schema(stations)
+    with ColumnarWriter(path, rows, schema, categories=categories) as writer:
+        offset = 0
+        for chunk in chunks:
+            writer.write(offset, chunk)
+            offset += len(chunk)
+    return rows
+
+
+def write_temperature_parallel(
+        path,
+        workers: Optional[int] = None,
+        start="2024-01-01",
+        end="2025-01-01",
+        freq="hour",
+        stations=1,
+        seed=42,
+        chunk_rows=1_000_000):
+    """
+    多进程并行生成模拟温度数据，写入单个列式目录
+    主进程按总行数预分配各列文件，工作进程逐个时间块生成并写入各自的行范围（内存映射），
+    结果可直接内存映射加载；内容只取决于seed与chunk_rows，与workers无关，
+    且与write_temperature_data写出的列式目录逐位一致
+    :param path: 输出目录
+    :param workers: 进程数（默认CPU核数）
+    :return: 写入的总行数
+    """
+    from src.storage import ColumnarWriter
+
+    _, _, steps = _time_grid(start, end, freq)
+    rows = steps * stations
+    blocks = _block_count(steps, stations, chunk_rows)
+    schema, categories = _columnar_schema(stations)
+
+    with ColumnarWriter(path, rows, schema, categories=categories):
+        tasks = [
+            (path, rows, start, end, freq, stations, seed, chunk_rows, block)
+            for block in range(blocks)
+        ]
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            written = [_write_block(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                written = list(executor.map(_write_block, tasks, chunksize=max(1, blocks // (workers * 4))))
+    return sum(written)
+
+
+def station_ids(stations):
+    """站点编号列表"""
+    return [f"ST{i:03d}" for i in range(stations)]
+
+
+def _columnar_schema(stations):
+    """列式目录的列类型与分类取值"""
+    if stations > 1:
+        schema = {"timestamp": "datetime64[ns]", "station": "category", "temperature": "float32"}
+        return schema, {"station": station_ids(stations)}
+    return {"timestamp": "datetime64[ns]", "temperature": "float32"}, {}
+
+
+def _time_grid(start, end, freq):
+    """返回起始时间、时间步长与总步数（不构造完整时间序列）"""
+    if freq not in FREQUENCIES:
+        raise ValueError("freq参数必须是hour/minute")
+    start_ts = pd.Timestamp(start)
+    step = FREQUENCIES[freq]
+    steps = int(-(-(pd.Timestamp(end) - start_ts) // step))
+    if steps <= 0:
+        raise ValueError("end必须晚于start")
+    return start_ts, step, steps
+
+
+def _block_count(steps, stations, chunk_rows):
+    """时间块数量"""
+    steps_per_chunk = _steps_per_chunk(stations, chunk_rows)
+    return -(-steps // steps_per_chunk)
+
+
+def _steps_per_chunk(stations, chunk_rows):
+    """每个时间块包含的时间步数"""
+    if stations < 1:
+        raise ValueError("stations必须大于0")
+    return max(1, chunk_rows // stations)
+
+
+def _station_offsets(seed, stations):
+    """各站点的基准温度偏移（第一个站点为参考站，偏移为0）"""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+    offsets = rng.normal(0, 3, stations)
+    offsets[0] = 0
+    return offsets
+
+
+def _noise_streams(seed, block, stations):
+    """(时间块, 站点)对应的独立随机数流"""
+    return [
+        np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1, block, station)))
+        for station in range(stations)
+    ]
+
+
+def _generate_block(start, end, freq, stations, seed, chunk_rows, block):
+    """生成第block个时间块"""
+    start_ts, step, steps = _time_grid(start, end, freq)
+    steps_per_chunk = _steps_per_chunk(stations, chunk_rows)
+    first = block * steps_per_chunk
+    last = min(first + steps_per_chunk, steps)
+    timestamps = pd.DatetimeIndex(start_ts + step * np.arange(first, last))
+    return _simulate(timestamps, _station_offsets(seed, stations), _noise_streams(seed, block, stations))
+
+
+def _write_block(task):
+    """工作进程：生成一个时间块并写入预分配列式目录中对应的行范围"""
+    from src.storage import ColumnarWriter
+
+    path, rows, start, end, freq, stations, seed, chunk_rows, block = task
+    df = _generate_block(start, end, freq, stations, seed, chunk_rows, block)
+    schema, categories = _columnar_schema(stations)
+    with ColumnarWriter(path, rows, schema, categories=categories, mode="r+") as writer:
+        writer.write(block * _steps_per_chunk(stations, chunk_rows) * stations, df)
+    return len(df)
+
+
+def _simulate(timestamps, offsets, streams):
+    """年周期 + 日周期 + 站点偏移 + 噪声"""
+    stations = len(offsets)
+
+    # 年内位置按实际年长计算，闰年同样对齐一个完整周期
+    hours_of_day = timestamps.hour + timestamps.minute / 60
+    year_fraction = (timestamps.dayofyear - 1 + hours_of_day / 24) / (365 + timestamps.is_leap_year)
 
-    # 生成时间序列
-    start_date = datetime(2024, 1, 1)
-    hours = 365 * 24
-    timestamps = [start_date + timedelta(hours=h) for h in range(hours)]
+    yearly = 15 * np.sin(2 * np.pi * np.asarray(year_fraction))  # 年周期
+    daily = 10 * np.sin(2 * np.pi * np.asarray(hours_of_day) / 24)  # 日周期
+    base = 5 + yearly + daily
 
-    # 生成温度数据（年周期 + 日周期 + 噪声）
-    t = np.arange(hours)
-    yearly = 15 * np.sin(2 * np.pi * t / (365 * 24))  # 年周期
-    daily = 10 * np.sin(2 * np.pi * t % 24 / 24)  # 日周期
-    noise = np.random.normal(0, 3, hours)  # 随机噪声
+    temperature = base[:, None] + offsets[None, :]
+    for station, rng in enumerate(streams):
+        temperature[:, station] += rng.normal(0, 3, len(timestamps))  # 随机噪声
 
-    temperature = 5 + yearly + daily + noise
-    return pd.DataFrame({"timestamp": timestamps, "temperature": temperature})
+    if stations == 1:
+        return pd.DataFrame({"timestamp": timestamps, "temperature": temperature.ravel()})
+    return pd.DataFrame({
+        "timestamp": np.repeat(timestamps.to_numpy(), stations),
+        "station": pd.Categorical.from_codes(
+            np.tile(np.arange(stations, dtype=np.int16), len(timestamps)),
+            categories=station_ids(stations)
+        ),
+        "temperature": temperature.ravel()
+    })
@@ -1,39 +1,58 @@
-import pandas as pd
-from config import settings
+import argparse
+import os
+import time
+
+from config import settings, visualization_config
+from config.visualization_config import (
+    PYE_3DSURFACE_CONFIG, PYE_CALENDAR_CONFIG, PYE_HEATMAP_CONFIG, PYE_LINE_CONFIG
+)
+from src.batch import RenderJob, render_batch
 from src.data_generator import generate_and_save_data
+from src.config_resolver import resolve_config
+from src.dataset import TemperatureDataset, get_dataset, load_dataset, register_dataset, select
+from src.registry import CHARTS, chart_names, load_chart, resolve_chart
 
-from src.matplot.area_plot import create_area_plot
-from src.matplot.box_plot import create_box_plot
-from src.matplot.calendar_hearmap import create_calendar_heatmap
-from src.matplot.heatmap import create_heatmap
-from src.matplot.line_plot import create_line_plot
-from src.matplot.surface_3d import create_3d_surface
 
-from src.pyeplot.calendar_heatmap import create_pye_calendar
-from src.pyeplot.heatmap import create_pye_heatmap
-from src.pyeplot.line_charts import create_pye_line
-from src.pyeplot.surface_3d import create_pye_3dsurface
+def pye_output_file(default_config, config):
+    """pyecharts图表的输出文件路径"""
+    return f"{config['output_path']}/{config.get('filename', default_config['filename'])}.html"
 
+def pye_sidecar_dirs():
+    """PyEcharts页面所在目录与各图表的sidecar目录（按main.py的输出目录与PYE_*_CONFIG中的sidecar_dir解析）"""
+    output_dirs, sidecar_dirs = set(), set()
+    for chart in chart_names("pyecharts"):
+        defaults = getattr(visualization_config, CHARTS[chart].default_config)
+        config = resolve_config(chart, defaults, {"output_path": settings.PYECHARTS_OUTPUT})
+        output_dirs.add(config["output_path"])
+        sidecar_dirs.add(os.path.join(config["output_path"], config.get("sidecar_dir", "data")))
+    return output_dirs, sidecar_dirs
 
-def mat_area_plot_generator():
-    # 加载数据
-    df = pd.read_csv(settings.DATA_PATH)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+def load_cube():
+    """共享的预聚合立方（每个数据版本只计算一次，持久化到缓存目录；STREAMING时分块流式聚合）"""
+    return get_dataset().cube(
+        cache_dir=settings.CACHE_DIR,
+        streaming=settings.STREAMING,
+        chunk_rows=settings.STREAM_CHUNK_ROWS
+    )
+
+def mat_area_plot_generator(image_format="png", use_cache=True):
+    # 加载每日平均温度
+    cube = load_cube()
 
     # 生成matplotlib面积图
-    create_area_plot(
-        df=df.resample('D', on='timestamp').mean().reset_index(),
+    return load_chart("create_area_plot")(
+        df=cube.daily_frame(),
         config={
-            "output": {"save_path": settings.MATPLOT_OUTPUT},
+            "output": {"save_path": settings.MATPLOT_OUTPUT, "format": image_format},
             "text": {"title": "2024年每日平均温度分布"}
         },
-        show=False
+        show=settings.SHOW_FIGURES,
+        use_cache=use_cache
     )
 
-def mat_box_plot_generator():
-    # 加载数据
-    df = pd.read_csv(settings.DATA_PATH)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+def mat_box_plot_generator(image_format="png", use_cache=True):
+    # 加载预聚合立方
+    cube = load_cube()
 
     # 自定义配置
     custom_config = {
@@ -47,22 +66,25 @@ def mat_box_plot_generator():
         },
         "output": {
             "save_path": settings.MATPLOT_OUTPUT,
+            "format": image_format,
             "filename": "monthly_temperature_box"
         }
     }
 
-    create_box_plot(
-        df=df,
+    return load_chart("create_box_plot")(
+        df=None,
         config=custom_config,
         group_by="month",
-        show=True,
+        show=settings.SHOW_FIGURES,
+        use_cache=use_cache,
+        cube=cube,
         box={"widths": 0.8}
     )
 
-def mat_calendar_generator():
-    df = pd.read_csv(settings.DATA_PATH)
-    create_calendar_heatmap(
-        df=df,
+def mat_calendar_generator(image_format="png", use_cache=True):
+    return load_chart("create_calendar_heatmap")(
+        df=None,
+        cube=load_cube(),
         config={
             "heatmap": {
                 "cmap": "RdYlBu_r",
@@ -71,16 +93,18 @@ def mat_calendar_generator():
             },
             "output": {
                 "save_path": settings.MATPLOT_OUTPUT,
+                "format": image_format,
                 "filename": "2024_temperature_calendar"
             }
         },
         year=2024,
-        show=True
+        show=settings.SHOW_FIGURES,
+        use_cache=use_cache
     )
 
-def mat_heatmap_generator():
-    # 加载数据
-    df = pd.read_csv(settings.DATA_PATH)
+def mat_heatmap_generator(image_format="png", use_cache=True):
+    # 加载预聚合立方
+    cube = load_cube()
 
     # 自定义配置
     custom_config = {
@@ -91,31 +115,24 @@ def mat_heatmap_generator():
         },
         "output": {
             "save_path": settings.MATPLOT_OUTPUT,
+            "format": image_format,
             "filename": "hourly_heatmap"
         }
     }
 
-    create_heatmap(
-        df=df,
+    return load_chart("create_heatmap")(
+        df=None,
         config=custom_config,
         time_granularity="hour",
-        show=True,
+        show=settings.SHOW_FIGURES,
+        use_cache=use_cache,
+        cube=cube,
         text={"title": "2024年逐小时温度分布热力图"}
     )
 
-def mat_line_chart_generator():
-    # 加载数据
-    df = pd.read_csv(settings.DATA_PATH)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-    # 设置 'timestamp' 列为索引
-    df.set_index('timestamp', inplace=True)
-
-    # 重采样为每天的平均温度
-    daily_avg_temp = df.resample('D').mean()
-
-    # 重置索引以便后续处理
-    daily_avg_temp.reset_index(inplace=True)
+def mat_line_chart_generator(image_format="png", use_cache=True):
+    # 加载每日平均温度
+    daily_avg_temp = load_cube().daily_frame()
 
     # 创建自定义配置
     custom_config = {
@@ -143,24 +160,26 @@ def mat_line_chart_generator():
         },
         "output": {
             "save_path": settings.MATPLOT_OUTPUT,
+            "format": image_format,
             "filename": "custom_temperature_trend"
         }
     }
 
     # 调用绘图函数
-    create_line_plot(
+    return load_chart("create_line_plot")(
         df=daily_avg_temp,
         config=custom_config,
-        show=True,
+        show=settings.SHOW_FIGURES,
+        use_cache=use_cache,
         # 也可以通过kwargs直接覆盖
         figure={"dpi": 800},
         line={"linewidth": 2.0}
     )
 
-def mat_3d_surface_generator():
-    df = pd.read_csv(settings.DATA_PATH)
-    create_3d_surface(
-        df=df,
+def mat_3d_surface_generator(image_format="png", use_cache=True):
+    return load_chart("create_3d_surface")(
+        df=None,
+        cube=load_cube(),
         config={
             "surface": {
                 "cmap": "viridis",
@@ -169,74 +188,150 @@ def mat_3d_surface_generator():
             },
             "output": {
                 "save_path": settings.MATPLOT_OUTPUT,
+                "format": image_format,
                 "filename": "3d_temp_surface_mat"
             }
         },
-        show=True
-    )
-
-def pye_calendar_generator():
-    df = pd.read_csv(settings.DATA_PATH)
-    create_pye_calendar(
-        df=df,
-        config={
-            "output_path": settings.PYECHARTS_OUTPUT,
-            "range_colors": ["#f7fbff", "#c6dbef", "#6baed6", "#2171b5", "#08306b"]
-        }
+        show=settings.SHOW_FIGURES,
+        use_cache=use_cache
     )
 
-def pye_heatmap_generator():
-    # 加载数据
-    df = pd.read_csv(settings.DATA_PATH)
+def pye_calendar_generator(use_cache=True):
+    config = {
+        "output_path": settings.PYECHARTS_OUTPUT,
+        "data_encoding": settings.PYE_DATA_ENCODING,
+        "range_colors": ["#f7fbff", "#c6dbef", "#6baed6", "#2171b5", "#08306b"]
+    }
+    load_chart("create_pye_calendar")(df=None, cube=load_cube(), config=config, use_cache=use_cache)
+    return pye_output_file(PYE_CALENDAR_CONFIG, config)
 
-    create_pye_heatmap(
-        df=df,
-        config={
-            "output_path": settings.PYECHARTS_OUTPUT,
-            "visualmap_colors": ["#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8",
-                                 "#fee090", "#fdae61", "#f46d43", "#d73027", "#a50026"],
-            "tooltip_formatter": "温度: {c} ℃<br/>日期: {b}<br/>小时: {a}"
-        },
-        time_granularity="hour"
+def pye_heatmap_generator(use_cache=True):
+    config = {
+        "output_path": settings.PYECHARTS_OUTPUT,
+        "data_encoding": settings.PYE_DATA_ENCODING,
+        "visualmap_colors": ["#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8",
+                             "#fee090", "#fdae61", "#f46d43", "#d73027", "#a50026"],
+        "tooltip_formatter": "温度: {c} ℃<br/>日期: {b}<br/>小时: {a}"
+    }
+    load_chart("create_pye_heatmap")(
+        df=None,
+        cube=load_cube(),
+        config=config,
+        time_granularity="hour",
+        use_cache=use_cache
     )
+    return pye_output_file(PYE_HEATMAP_CONFIG, config)
 
-def pye_line_chart_generator():
+def pye_line_chart_generator(use_cache=True):
     # 生成pyecharts折线图
     # 加载数据
-    df = pd.read_csv(settings.DATA_PATH)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    create_pye_line(
-        df=df,
-        config={
-            "output_path": settings.PYECHARTS_OUTPUT,
-            "width": "1800px",
-            "height": "900px",
-            "datazoom_range_start": 20,
-            "datazoom_range_end": 80
-        }
-    )
+    df = load_dataset()
+    config = {
+        "output_path": settings.PYECHARTS_OUTPUT,
+        "data_encoding": settings.PYE_DATA_ENCODING,
+        "width": "1800px",
+        "height": "900px",
+        "datazoom_range_start": 20,
+        "datazoom_range_end": 80
+    }
+    load_chart("create_pye_line")(df=df, config=config, use_cache=use_cache)
+    return pye_output_file(PYE_LINE_CONFIG, config)
 
-def pye_3d_surface_generator():
-    df = pd.read_csv(settings.DATA_PATH)
-    create_pye_3dsurface(
-        df=df,
-        config={
-            "output_path": settings.PYECHARTS_OUTPUT,
-            "range_colors": ["#006837", "#1a9850", "#a6d96a", "#fdae61", "#d7191c"]
-        }
-    )
+def pye_3d_surface_generator(use_cache=True):
+    config = {
+        "output_path": settings.PYECHARTS_OUTPUT,
+        "data_encoding": settings.PYE_DATA_ENCODING,
+        "range_colors": ["#006837", "#1a9850", "#a6d96a", "#fdae61", "#d7191c"]
+    }
+    load_chart("create_pye_3dsurface")(df=None, cube=load_cube(), config=config, use_cache=use_cache)
+    return pye_output_file(PYE_3DSURFACE_CONFIG, config)
+
+# 全部图表任务（按执行顺序，键为src/registry.py中的图表名）
+GENERATORS = {
+    "create_area_plot": mat_area_plot_generator,
+    "create_box_plot": mat_box_plot_generator,
+    "create_calendar_heatmap": mat_calendar_generator,
+    "create_heatmap": mat_heatmap_generator,
+    "create_line_plot": mat_line_chart_generator,
+    "create_3d_surface": mat_3d_surface_generator,
+    "create_pye_calendar": pye_calendar_generator,
+    "create_pye_heatmap": pye_heatmap_generator,
+    "create_pye_line": pye_line_chart_generator,
+    "create_pye_3dsurface": pye_3d_surface_generator
+}
+
+def select_charts(names=None, engine=None):
+    """按名称（可省略create_前缀）与引擎筛选图表，默认全部"""
+    charts = [resolve_chart(name) for name in names] if names else list(GENERATORS)
+    return [chart for chart in charts if engine is None or CHARTS[chart].engine == engine]
+
+def prepare_data(charts):
+    """只加载所选图表需要的数据：立方（含逐日均值表）和/或完整数据框；筛选后没有数据时报错"""
+    needs = {CHARTS[chart].data for chart in charts}
+    if needs & {"cube", "daily"}:
+        load_cube()
+    if needs & {"frame", "index"} and len(get_dataset().frame) == 0:
+        raise ValueError("所选时间窗口与站点中没有数据")
+
+def build_jobs(charts=None, image_format="png", use_cache=True):
+    """将图表生成函数包装为批量渲染任务"""
+    jobs = []
+    for chart in charts or GENERATORS:
+        func = GENERATORS[chart]
+        kwargs = {"use_cache": use_cache}
+        if CHARTS[chart].engine == "matplot":
+            kwargs["image_format"] = image_format
+        jobs.append(RenderJob(func.__name__, func, kwargs, CHARTS[chart].engine))
+    return jobs
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="生成模拟温度数据并批量渲染图表")
+    parser.add_argument("charts", nargs="*", help="要生成的图表（create_*函数名，可省略create_前缀；默认全部）")
+    parser.add_argument("--engine", choices=["matplot", "pyecharts"], default=None, help="只生成指定引擎的图表")
+    parser.add_argument("--start", default=None, help="时间窗口起点（包含），如2024-03-01")
+    parser.add_argument("--end", default=None, help="时间窗口终点（不包含），如2024-06-01")
+    parser.add_argument("--station", action="append", default=None, help="只使用指定站点的数据（可重复）")
+    parser.add_argument("--format", dest="image_format", choices=["png", "svg", "pdf", "jpg"], default="png",
+                        help="Matplotlib图片格式（PyEcharts固定输出html）")
+    parser.add_argument("--jobs", type=int, default=None, help="并行渲染的进程数（默认CPU核数）")
+    parser.add_argument("--force", action="store_true", help="忽略输出缓存，重新渲染全部所选图表")
+    parser.add_argument("--regenerate", action="store_true", help="重新生成模拟数据（数据文件不存在时总会生成）")
+    parser.add_argument("--list", action="store_true", help="列出可用图表后退出")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    generate_and_save_data()
-
-    mat_area_plot_generator()
-    mat_box_plot_generator()
-    mat_calendar_generator()
-    mat_heatmap_generator()
-    mat_line_chart_generator()
-    mat_3d_surface_generator()
-
-    pye_calendar_generator()
-    pye_heatmap_generator()
-    pye_line_chart_generator()
-    pye_3d_surface_generator()
+    args = parse_args()
+    if args.list:
+        for name in chart_names(args.engine):
+            print(f"{name}\t{CHARTS[name].engine}")
+        raise SystemExit
+    try:
+        charts = select_charts(args.charts, args.engine)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    settings.ensure_output_dirs()
+    if args.regenerate or not os.path.exists(settings.DATA_PATH):
+        generate_and_save_data()
+    selection = select(args.start, args.end, args.station)
+    if selection is not None:
+        register_dataset(TemperatureDataset(settings.DATA_PATH, selection=selection))
+
+    # 在主进程中预先加载所选图表需要的数据，通过共享内存交给工作进程
+    try:
+        prepare_data(charts)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    use_cache = settings.OUTPUT_CACHE and not args.force
+    started = time.time()
+    results = render_batch(build_jobs(charts, args.image_format, use_cache), workers=args.jobs, dataset=get_dataset())
+    # 数据或配置变化后旧的sidecar不再被页面引用，渲染结束后清理（只在渲染了PyEcharts图表时导入pyecharts）
+    if any(CHARTS[chart].engine == "pyecharts" for chart in charts):
+        from src.pyeplot.payload import prune_sidecars
+        prune_sidecars(*pye_sidecar_dirs(), before=started)
+    for result in results:
+        cached = " 缓存命中" if result["cache"] and all(item["status"] == "hit" for item in result["cache"]) else ""
+        print(f"[{result['status']}] {result['name']}（{result['seconds']}s）{cached}")
+        if result["error"]:
+            print(result["error"])
@@ -0,0 +1,482 @@
+# src/aggregation.py
+"""
+预聚合数据立方
+对原始数据只做一次聚合，得到小时×日矩阵、逐日/逐月统计（均值、极值、分位数、计数）
+与箱线图统计量，供matplotlib与pyecharts的全部图表复用，并支持持久化；
+分组编码等临时数组逐块生成（见TimeIndex.blocks），构建立方时不产生与数据等长的中间数组
+"""
+import calendar
+import hashlib
+import os
+import pickle
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dtypes import float_dtype
+from src.time_index import TimeIndex, as_time_index
+
+# 箱线图支持的分组方式
+BOX_GROUPS = ("month", "day", "hour")
+# 日历图每日取值的聚合方式
+DAILY_AGGREGATES = ("mean", "min", "max", "range", "count")
+# 一年最多的天数（闰年）
+DAYS_PER_YEAR = 366
+# 一小时/一天对应的纳秒数
+HOUR_NS = 3600 * 10 ** 9
+DAY_NS = 24 * HOUR_NS
+
+
+class AggregationCube:
+    """
+    温度数据预聚合立方
+
+    属性：
+    years : 数据覆盖的年份范围（升序、连续）
+    hourly_sum / hourly_count : (年, 小时, 年内第几天) 三维求和/计数数组
+    daily : 逐日统计表（sum/count/mean/min/max），连续覆盖首尾日期
+    monthly : 逐月统计表（count/mean/min/max/q25/q50/q75）
+    boxes : 按month/day/hour分组的箱线图统计量
+    """
+
+    def __init__(
+            self,
+            years: np.ndarray,
+            hourly_sum: np.ndarray,
+            hourly_count: np.ndarray,
+            daily: pd.DataFrame,
+            monthly: pd.DataFrame,
+            boxes: Dict[str, List[dict]],
+            time_col: str = "timestamp",
+            value_col: str = "temperature"):
+        self.years = years
+        self.hourly_sum = hourly_sum
+        self.hourly_count = hourly_count
+        self.daily = daily
+        self.monthly = monthly
+        self.boxes = boxes
+        self.time_col = time_col
+        self.value_col = value_col
+
+    @classmethod
+    def build(
+            cls,
+            df: pd.DataFrame,
+            time_col: str = "timestamp",
+            value_col: str = "temperature") -> "AggregationCube":
+        """
+        从原始数据构建聚合立方
+
+        参数：
+        df : 原始数据框或时间索引（复用其已缓存的日历字段）
+        time_col : 时间列名称（默认'timestamp'）
+        value_col : 数值列名称（默认'temperature'）
+        """
+        index = as_time_index(df, time_col, (value_col,))
+        if len(index) == 0:
+            raise ValueError("数据为空，无法构建聚合立方（检查时间窗口与站点筛选条件）")
+        years, hourly_sum, hourly_count = hourly_grid(index, value_col)
+        return cls(
+            years=years,
+            hourly_sum=hourly_sum,
+            hourly_count=hourly_count,
+            daily=daily_table(index, value_col),
+            monthly=monthly_table(index, value_col),
+            boxes={group_by: box_stats(index, value_col, group_by) for group_by in BOX_GROUPS},
+            time_col=time_col,
+            value_col=value_col
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        """立方内容哈希（首次访问时计算；立方构建后不再修改，用作输出缓存的数据指纹）"""
+        if getattr(self, "_fingerprint", None) is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for array in (self.years, self.hourly_sum, self.hourly_count):
+                digest.update(f"{array.dtype.str}{array.shape}".encode("utf-8"))
+                digest.update(np.ascontiguousarray(array).tobytes())
+            for table in (self.daily, self.monthly):
+                digest.update(pd.util.hash_pandas_object(table).to_numpy().tobytes())
+            digest.update(f"{self.time_col}|{self.value_col}".encode("utf-8"))
+            for group_by in sorted(self.boxes):
+                for stats in self.boxes[group_by]:
+                    for name in sorted(stats):
+                        value = np.asarray(stats[name])
+                        digest.update(f"{group_by}|{name}|{value.dtype.str}{value.shape}".encode("utf-8"))
+                        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(stats[name]).encode("utf-8"))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def hour_day_matrix(self, year: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        小时×日均值矩阵
+
+        参数：
+        year : 指定年份；None表示所有年份按年内第几天合并
+        返回：(24×天数矩阵, 对应的年内天序号数组)
+        """
+        return _hour_day_from_grid(self.years, self.hourly_sum, self.hourly_count, year)
+
+    def hour_span_matrix(self, years: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        跨年的小时×日均值矩阵
+
+        参数：
+        years : 按顺序首尾相接的年份
+        返回：(24×天数矩阵, 自首个年份1月1日起的天序号数组)
+        """
+        return _hour_span_from_grid(self.years, self.hourly_sum, self.hourly_count, years)
+
+    def calendar_matrix(self, granularity: str) -> pd.DataFrame:
+        """
+        日历维度均值矩阵
+
+        参数：
+        granularity : day（日×月）/month（月×年）
+        """
+        return _calendar_from_daily(self.daily, granularity)
+
+    def daily_frame(self, stat: str = "mean") -> pd.DataFrame:
+        """
+        逐日统计序列（等价于resample('D')后的结果）
+
+        参数：
+        stat : 统计量mean/min/max/count/sum
+        """
+        if stat not in self.daily.columns:
+            raise ValueError(f"stat参数必须是{'/'.join(self.daily.columns)}")
+        return pd.DataFrame({
+            self.time_col: self.daily.index,
+            self.value_col: self.daily[stat].to_numpy()
+        })
+
+    def box_stats(self, group_by: str) -> List[dict]:
+        """按分组返回箱线图统计量（可直接传给Axes.bxp）"""
+        if group_by not in self.boxes:
+            raise ValueError("group_by参数必须是month/day/hour")
+        return self.boxes[group_by]
+
+    def save(self, path: str) -> None:
+        """持久化到文件"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AggregationCube":
+        """从文件加载"""
+        with open(path, "rb") as f:
+            cube = pickle.load(f)
+        if not isinstance(cube, cls):
+            raise ValueError(f"{path}不是有效的聚合立方文件")
+        return cube
+
+
+def hourly_grid(index: TimeIndex, value_col: str = "temperature") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """按(年, 小时, 年内第几天)累计求和与计数（逐块累加）"""
+    if len(index) == 0:
+        raise ValueError("数据为空，无法按小时汇总")
+    first_year, last_year = _edge_field(index, "year")
+    years = np.arange(first_year, last_year + 1)
+    size = len(years) * 24 * DAYS_PER_YEAR
+    sums = np.zeros(size)
+    counts = np.zeros(size, dtype=np.int64)
+    for block in index.blocks():
+        flat = block.field("year").astype(np.int64)
+        flat -= years[0]
+        flat *= 24
+        flat += block.field("hour")
+        flat *= DAYS_PER_YEAR
+        flat += block.field("dayofyear")
+        flat -= 1
+        flat, values = _drop_nan(flat, _values(block, value_col))
+        sums += np.bincount(flat, weights=values, minlength=size)
+        counts += np.bincount(flat, minlength=size)
+
+    shape = (len(years), 24, DAYS_PER_YEAR)
+    return years, sums.reshape(shape), counts.astype(np.int32).reshape(shape)
+
+
+def hour_day_matrix(
+        df: pd.DataFrame,
+        time_col: str = "timestamp",
+        value_col: str = "temperature",
+        year: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    直接从原始数据计算小时×日均值矩阵（不构建完整立方）
+    规则的逐小时序列直接由数值数组重排得到（视图，只读使用）；其余情况回退到分组求均值
+    """
+    index = as_time_index(df, time_col, (value_col,))
+    if year is not None:
+        index = index.year(year)
+        if len(index) == 0:
+            raise ValueError(f"数据中不包含{year}年")
+    regular = regular_hour_day_matrix(index, value_col)
+    if regular is not None:
+        return regular
+    return _hour_day_from_grid(*hourly_grid(index, value_col), year)
+
+
+def hour_span_matrix(
+        df: pd.DataFrame,
+        time_col: str = "timestamp",
+        value_col: str = "temperature",
+        years: Sequence[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+    """直接从原始数据计算跨年的小时×日均值矩阵（不构建完整立方，见AggregationCube.hour_span_matrix）"""
+    index = as_time_index(df, time_col, (value_col,))
+    return _hour_span_from_grid(*hourly_grid(index, value_col), years)
+
+
+def regular_hour_day_matrix(
+        index: TimeIndex,
+        value_col: str = "temperature") -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    规则逐小时序列的小时×日矩阵
+    时间戳需按小时对齐、严格递增且位于同一年，缺测小时一次性散点填充为NaN；
+    数据完整时返回数值数组的转置视图，不发生拷贝
+
+    参数：
+    index : 时间索引（通常为单年切片）
+    value_col : 数值列名称（默认'temperature'）
+    返回：(24×天数矩阵, 对应的年内天序号数组)；不满足条件时返回None
+    """
+    ns = index.ns
+    if len(ns) == 0:
+        return None
+    year = pd.Timestamp(ns[0]).year
+    if pd.Timestamp(ns[-1]).year != year:
+        return None
+
+    offsets = ns - pd.Timestamp(year=year, month=1, day=1).value
+    if np.any(offsets % HOUR_NS) or np.any(offsets[1:] == offsets[:-1]):
+        return None
+    slots = offsets // HOUR_NS
+    first_day = int(slots[0] // 24)
+    n_days = int(slots[-1] // 24) - first_day + 1
+    slots -= first_day * 24
+
+    values = _values(index, value_col)
+    if slots[0] == 0 and len(slots) == n_days * 24:
+        grid = values
+    else:
+        grid = np.full(n_days * 24, np.nan, dtype=np.result_type(values.dtype, np.float32))
+        grid[slots] = values
+    return grid.reshape(n_days, 24).T, np.arange(first_day, first_day + n_days) + 1
+
+
+def calendar_matrix(
+        df: pd.DataFrame,
+        time_col: str = "timestamp",
+        value_col: str = "temperature",
+        granularity: str = "day") -> pd.DataFrame:
+    """直接从原始数据计算日历维度均值矩阵（不构建完整立方）"""
+    index = as_time_index(df, time_col, (value_col,))
+    return _calendar_from_daily(daily_table(index, value_col), granularity)
+
+
+def daily_table(index: TimeIndex, value_col: str = "temperature") -> pd.DataFrame:
+    """逐日统计表，缺测日为NaN（逐块累加）"""
+    first_day = int(index.ns[0] // DAY_NS)
+    state = _group_state(int(index.ns[-1] // DAY_NS) - first_day + 1)
+    for block in index.blocks():
+        codes = block.ns // DAY_NS
+        codes -= first_day
+        _accumulate_groups(state, codes, _values(block, value_col))
+    table = _state_table(state)
+    table.index = pd.date_range(
+        pd.Timestamp(first_day * DAY_NS), periods=len(table), freq="D", name=index.time_col
+    )
+    return table
+
+
+def daily_aggregate(table: pd.DataFrame, aggregate: str = "mean") -> np.ndarray:
+    """
+    从统计表中取出每组一个值
+
+    参数：
+    table : 含count/mean/min/max列的统计表（如daily_table的结果）
+    aggregate : mean/min/max/range（最高减最低）/count
+    返回：float64数组，没有数据的组为NaN
+    """
+    if aggregate not in DAILY_AGGREGATES:
+        raise ValueError(f"aggregate参数必须是{'/'.join(DAILY_AGGREGATES)}")
+    if aggregate == "range":
+        values = table["max"].to_numpy(dtype=np.float64) - table["min"].to_numpy(dtype=np.float64)
+    else:
+        values = table[aggregate].to_numpy(dtype=np.float64)
+    return np.where(table["count"].to_numpy() > 0, values, np.nan)
+
+
+def monthly_table(index: TimeIndex, value_col: str = "temperature") -> pd.DataFrame:
+    """逐月统计表（含四分位数），缺测月为NaN；数据按时间排序，各月直接取连续行切片（视图）计算"""
+    values = _values(index, value_col)
+    (first_year, last_year), (first_month, last_month) = _edge_field(index, "year"), _edge_field(index, "month")
+    first = pd.Timestamp(year=first_year, month=first_month, day=1)
+    n_groups = (last_year - first_year) * 12 + last_month - first_month + 1
+    starts = pd.date_range(first, periods=n_groups + 1, freq="MS").to_numpy(dtype="datetime64[ns]").view(np.int64)
+    bounds = np.searchsorted(index.ns, starts, "left")
+
+    stats = np.full((n_groups, 7), np.nan)
+    stats[:, 0] = 0
+    for code, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        group = _drop_nan(values[start:stop], values[start:stop])[1]
+        if len(group):
+            stats[code] = (
+                len(group), np.sum(group, dtype=np.float64) / len(group), group.min(), group.max(),
+                *np.quantile(group, [0.25, 0.5, 0.75])
+            )
+    table = pd.DataFrame(stats, columns=["count", "mean", "min", "max", "q25", "q50", "q75"])
+    table["count"] = table["count"].astype(np.int64)
+    table.index = pd.date_range(first, periods=n_groups, freq="MS", name=index.time_col)
+    return table
+
+
+def box_stats(index: TimeIndex, value_col: str = "temperature", group_by: str = "month") -> List[dict]:
+    """按month/day/hour分组计算箱线图统计量（仅包含有数据的分组，按分组值升序）"""
+    from matplotlib import cbook
+
+    if group_by not in BOX_GROUPS:
+        raise ValueError("group_by参数必须是month/day/hour")
+    # 逐组用掩码取出数值，同一时刻只保留一个分组的拷贝（分组字段用完即释放）
+    codes = index.field(group_by, cache=False)
+    values = _values(index, value_col)
+    stats = []
+    for code in range(int(codes.min()), int(codes.max()) + 1):
+        group = values[codes == code]
+        group = _drop_nan(group, group)[1]
+        if len(group):
+            stats.extend(cbook.boxplot_stats([group]))
+    return stats
+
+
+def _values(index: TimeIndex, value_col: str) -> np.ndarray:
+    """取出浮点数值数组（浮点列不做类型转换）"""
+    values = index[value_col].to_numpy()
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    return values
+
+
+def _drop_nan(codes: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """去掉缺测值（没有缺测时直接返回原数组，不产生拷贝）"""
+    valid = ~np.isnan(values)
+    if valid.all():
+        return codes, values
+    return codes[valid], values[valid]
+
+
+def _edge_field(index: TimeIndex, name: str) -> Tuple[int, int]:
+    """首行与末行的日历字段值（不计算整列）"""
+    n = len(index)
+    return int(index.rows(0, 1).field(name)[0]), int(index.rows(n - 1, n).field(name)[0])
+
+
+def _group_table(codes: np.ndarray, values: np.ndarray, n_groups: int) -> pd.DataFrame:
+    """按整数编码分组计算sum/count/mean/min/max"""
+    state = _group_state(n_groups)
+    _accumulate_groups(state, codes, values)
+    return _state_table(state)
+
+
+def _group_state(n_groups: int) -> Dict[str, np.ndarray]:
+    """分组累加状态（sum/count/min/max）"""
+    return {
+        "sum": np.zeros(n_groups),
+        "count": np.zeros(n_groups, dtype=np.int64),
+        "min": np.full(n_groups, np.nan),
+        "max": np.full(n_groups, np.nan)
+    }
+
+
+def _accumulate_groups(state: Dict[str, np.ndarray], codes: np.ndarray, values: np.ndarray) -> None:
+    """把一块数据累加到分组状态"""
+    codes, values = _drop_nan(codes, values)
+    if not len(values):
+        return
+    n_groups = len(state["sum"])
+    state["sum"] += np.bincount(codes, weights=values, minlength=n_groups)
+    state["count"] += np.bincount(codes, minlength=n_groups)
+
+    if np.any(codes[1:] < codes[:-1]):
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        values = values[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    keys = codes[starts]
+    # 同一分组可能跨块，与已有极值比较（NaN表示尚无数据）
+    state["min"][keys] = np.fmin(state["min"][keys], np.minimum.reduceat(values, starts))
+    state["max"][keys] = np.fmax(state["max"][keys], np.maximum.reduceat(values, starts))
+
+
+def _state_table(state: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """由分组累加状态生成sum/count/mean/min/max表"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = state["sum"] / state["count"]
+    return pd.DataFrame({
+        "sum": state["sum"], "count": state["count"], "mean": means, "min": state["min"], "max": state["max"]
+    })
+
+
+def _hour_day_from_grid(years, sums, counts, year=None) -> Tuple[np.ndarray, np.ndarray]:
+    """从(年, 小时, 天)网格中取出小时×日均值矩阵"""
+    if year is None:
+        sums = sums.sum(axis=0)
+        counts = counts.sum(axis=0)
+    else:
+        index = np.searchsorted(years, year)
+        if index >= len(years) or years[index] != year or not counts[index].any():
+            raise ValueError(f"数据中不包含{year}年")
+        sums = sums[index]
+        counts = counts[index]
+
+    days = np.flatnonzero(counts.sum(axis=0) > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = sums[:, days] / counts[:, days]
+    dtype = float_dtype()
+    if dtype is not None:
+        matrix = matrix.astype(dtype, copy=False)
+    return matrix, days + 1
+
+
+def _hour_span_from_grid(grid_years, sums, counts, years) -> Tuple[np.ndarray, np.ndarray]:
+    """把(年, 小时, 天)网格中指定各年按顺序首尾相接，得到跨年的小时×日均值矩阵"""
+    if not len(years):
+        raise ValueError("years参数不能为空")
+    span_sums, span_counts = [], []
+    for year in years:
+        index = np.searchsorted(grid_years, year)
+        if index >= len(grid_years) or grid_years[index] != year or not counts[index].any():
+            raise ValueError(f"数据中不包含{year}年")
+        n_days = 366 if calendar.isleap(int(year)) else 365
+        span_sums.append(sums[index, :, :n_days])
+        span_counts.append(counts[index, :, :n_days])
+    sums = np.concatenate(span_sums, axis=1)
+    counts = np.concatenate(span_counts, axis=1)
+
+    days = np.flatnonzero(counts.sum(axis=0) > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = sums[:, days] / counts[:, days]
+    dtype = float_dtype()
+    if dtype is not None:
+        matrix = matrix.astype(dtype, copy=False)
+    return matrix, days + 1
+
+
+def _calendar_from_daily(daily: pd.DataFrame, granularity: str) -> pd.DataFrame:
+    """由逐日统计表汇总日×月或月×年均值矩阵"""
+    dates = daily.index
+    if granularity == "day":
+        rows, cols = dates.day, dates.month
+    elif granularity == "month":
+        rows, cols = dates.month, dates.year
+    else:
+        raise ValueError("granularity参数必须是day/month")
+
+    totals = daily[["sum", "count"]].groupby([rows, cols]).sum()
+    totals = totals[totals["count"] > 0]
+    return (totals["sum"] / totals["count"]).unstack()
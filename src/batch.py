@@ -0,0 +1,195 @@
+# src/batch.py
+"""
+批量渲染
+在进程池中并行执行图表任务：工作进程使用Agg后端、从不弹出窗口
+（只有批次中含matplotlib任务时才在初始化时导入matplotlib，纯PyEcharts批次不加载它），
+单个任务失败（异常或工作进程崩溃）只记录在清单中，不影响其他任务；
+指定数据集时先发布到共享内存（见src/shared.py），工作进程附加后直接使用，不再各自加载
+"""
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from config import settings
+from src import render_cache
+from src.dataset import TemperatureDataset
+from src.shared import SharedDataset, SharedDatasetHandle, attach_dataset
+
+MANIFEST_FILE = "render_manifest.json"
+
+
+class RenderJob(NamedTuple):
+    """
+    图表任务
+
+    参数：
+    name : 任务名称（清单中的标识）
+    func : 可在工作进程中导入的模块级函数，返回输出文件路径（或路径列表）
+    kwargs : 调用参数
+    engine : 图表引擎matplot/pyecharts（None表示未知，按可能使用matplotlib处理）
+    """
+    name: str
+    func: Callable[..., Any]
+    kwargs: Optional[Dict[str, Any]] = None
+    engine: Optional[str] = None
+
+
+def render_batch(
+        jobs: Sequence[RenderJob],
+        workers: Optional[int] = None,
+        manifest_path: Optional[str] = None,
+        dataset: Optional[TemperatureDataset] = None) -> List[dict]:
+    """
+    并行渲染一组图表任务
+
+    参数：
+    jobs : 图表任务列表
+    workers : 进程数（默认CPU核数，1表示在当前进程中依次执行，不改动调用方的matplotlib后端与图形）
+    manifest_path : 清单文件路径（默认settings.OUTPUT_DIR下的render_manifest.json）
+    dataset : 共享给工作进程的数据集（连同其已构建的立方），任务结束后释放共享内存
+    返回：按任务顺序排列的结果列表（name/status/outputs/seconds/pid/error/cache）
+    """
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    matplot = any(job.engine != "pyecharts" for job in jobs)
+    started = time.perf_counter()
+
+    if workers == 1:
+        # 关闭交互显示后图表直接使用Agg画布（见src/matplot/canvas.py），无需切换调用方的后端
+        show = settings.SHOW_FIGURES
+        settings.SHOW_FIGURES = False
+        try:
+            results = [_run_job(job, close_figures=False) for job in jobs]
+        finally:
+            settings.SHOW_FIGURES = show
+    elif dataset is not None:
+        with SharedDataset(dataset) as shared:
+            results = _run_in_pool(jobs, workers, shared.handle, matplot)
+    else:
+        results = _run_in_pool(jobs, workers, matplot=matplot)
+
+    write_manifest(results, workers, time.perf_counter() - started, manifest_path)
+    return results
+
+
+def _run_in_pool(
+        jobs: Sequence[RenderJob],
+        workers: int,
+        handle: Optional[SharedDatasetHandle] = None,
+        matplot: bool = True) -> List[dict]:
+    """
+    在进程池中执行任务
+    工作进程崩溃会使整个进程池失效且无法判断是哪个任务导致的，
+    此时未完成的任务逐个在独立进程中重跑，只有真正导致崩溃的任务记为失败
+    """
+    results = [None] * len(jobs)
+    broken = _pool_round(jobs, range(len(jobs)), workers, results, handle, matplot)
+    for i in broken:
+        if _pool_round(jobs, [i], 1, results, handle, matplot):
+            results[i] = _failed(jobs[i], "工作进程异常退出")
+    return results
+
+
+def _pool_round(
+        jobs: Sequence[RenderJob],
+        indices,
+        workers: int,
+        results: List[dict],
+        handle: Optional[SharedDatasetHandle] = None,
+        matplot: bool = True) -> List[int]:
+    """执行一轮任务并写入results，返回因进程池失效而未完成的任务序号"""
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(handle, matplot)) as executor:
+        futures = {executor.submit(_run_job, jobs[i]): i for i in indices}
+        for future, i in futures.items():
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool:
+                broken.append(i)
+            except Exception:
+                results[i] = _failed(jobs[i], traceback.format_exc())
+    return broken
+
+
+def write_manifest(
+        results: List[dict],
+        workers: int,
+        seconds: float,
+        path: Optional[str] = None) -> str:
+    """写入渲染清单（先写临时文件再替换，避免读到半个文件）"""
+    path = path or os.path.join(settings.OUTPUT_DIR, MANIFEST_FILE)
+    manifest = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "succeeded": sum(result["status"] == "ok" for result in results),
+        "failed": sum(result["status"] != "ok" for result in results),
+        "cached": sum(bool(result["cache"]) and all(item["status"] == "hit" for item in result["cache"])
+                      for result in results),
+        "jobs": results
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _init_worker(handle: Optional[SharedDatasetHandle] = None, matplot: bool = True) -> None:
+    """
+    工作进程初始化：使用无界面的Agg后端、关闭交互显示并附加共享数据集
+
+    参数：
+    handle : 共享数据集描述
+    matplot : 批次中是否有matplotlib任务；没有时不导入matplotlib，只通过环境变量指定后端（之后被导入时生效）
+    """
+    os.environ["MPLBACKEND"] = "Agg"
+    if matplot or "matplotlib" in sys.modules:
+        import matplotlib
+        matplotlib.use("Agg", force=True)
+    settings.SHOW_FIGURES = False
+    if handle is not None:
+        attach_dataset(handle)
+
+
+def _run_job(job: RenderJob, close_figures: bool = True) -> dict:
+    """
+    执行单个任务，异常转为失败结果
+
+    参数：
+    job : 图表任务
+    close_figures : 任务结束后关闭pyplot中残留的图形（在调用方进程中执行时为False，保留调用方自己的图形）
+    """
+    started = time.perf_counter()
+    result = {"name": job.name, "status": "ok", "outputs": [], "pid": os.getpid(), "error": None}
+    render_cache.take_events()
+    try:
+        outputs = job.func(**(job.kwargs or {}))
+        if isinstance(outputs, str):
+            outputs = [outputs]
+        result["outputs"] = [str(output) for output in (outputs or []) if output]
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc()
+    finally:
+        # 只在任务用到pyplot时关闭残留的图形（不为此导入pyplot）
+        pyplot = sys.modules.get("matplotlib.pyplot") if close_figures else None
+        if pyplot is not None:
+            pyplot.close("all")
+    # 输出缓存的键、是否命中与渲染耗时
+    result["cache"] = render_cache.take_events()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _failed(job: RenderJob, error: str) -> dict:
+    """无法取回结果的任务"""
+    return {"name": job.name, "status": "error", "outputs": [], "pid": None, "error": error, "seconds": None, "cache": []}
@@ -0,0 +1,165 @@
+# src/config_resolver.py
+"""
+图表配置解析
+默认配置、config参数与关键字参数按层级深度合并（覆盖项中的字典只替换对应的子项），
+结果冻结为只读、可哈希的FrozenConfig；同一(图表, 默认配置, 覆盖项)组合只解析一次。
+默认配置按对象只冻结一次（visualization_config中的模块级字典），每次调用只冻结较小的覆盖项；
+合并时总是生成新字典，visualization_config中的默认配置永远不会被修改
+"""
+import hashlib
+import json
+import threading
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+class FrozenConfig(Mapping):
+    """
+    只读配置（嵌套字典同样冻结，列表冻结为元组）
+
+    按字典方式读取（config["figure"]["dpi"]、config.get(...)）；
+    可作为字典键或缓存键，digest为跨进程稳定的内容哈希
+    """
+    __slots__ = ("_data", "_hash", "_digest")
+
+    def __init__(self, data: Mapping = ()):
+        self._data = {key: freeze(value) for key, value in dict(data).items()}
+        self._hash = None
+        self._digest = None
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self._data.items()))
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, FrozenConfig):
+            return self._data == other._data
+        return isinstance(other, Mapping) and self._data == freeze(other)._data
+
+    def __repr__(self) -> str:
+        return f"FrozenConfig({self._data!r})"
+
+    def __reduce__(self):
+        return FrozenConfig, (self.to_dict(),)
+
+    @property
+    def digest(self) -> str:
+        """内容哈希（与进程、字典顺序无关）"""
+        if self._digest is None:
+            payload = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False, default=repr)
+            self._digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+        return self._digest
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为普通的可修改字典（嵌套配置同样转换，元组保持不变）"""
+        return {key: value.to_dict() if isinstance(value, FrozenConfig) else value for key, value in self._data.items()}
+
+
+def freeze(value: Any) -> Any:
+    """把字典/列表/集合/数组递归转换为不可变对象"""
+    if isinstance(value, _SCALARS):
+        return value
+    if isinstance(value, FrozenConfig):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenConfig(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    return value
+
+
+# 原样保留的常见标量类型（跳过后续的抽象类检查）
+_SCALARS = (str, int, float, bool, type(None))
+_EMPTY = FrozenConfig()
+
+
+def merge(base: Mapping, overrides: Mapping) -> Dict[str, Any]:
+    """
+    深度合并（不修改任何输入）
+
+    参数：
+    base : 基础配置
+    overrides : 覆盖项；值为字典且基础配置中对应项也是字典时逐项合并，否则直接替换
+    返回：合并后的新字典
+    """
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def resolve_config(
+        chart: str,
+        defaults: Mapping,
+        config: Optional[Mapping] = None,
+        overrides: Optional[Mapping] = None) -> FrozenConfig:
+    """
+    解析图表的最终配置
+
+    参数：
+    chart : 图表名称（create_*函数名）
+    defaults : 该图表的默认配置
+    config : 调用方传入的配置（可选）
+    overrides : 关键字参数形式的覆盖项（可选，优先级最高）
+    返回：冻结的最终配置
+    """
+    frozen = (
+        frozen_defaults(defaults),
+        freeze(config) if config else _EMPTY,
+        freeze(overrides) if overrides else _EMPTY
+    )
+    try:
+        return _resolve_cached(chart, *frozen)
+    except TypeError:
+        # 覆盖项中含有不可哈希的对象时不缓存
+        return _resolve(*frozen)
+
+
+def frozen_defaults(defaults: Mapping) -> FrozenConfig:
+    """
+    冻结后的默认配置（按对象缓存，同一个默认配置字典只冻结一次）
+    默认配置在运行期间视为常量；缓存同时持有原对象，其id不会被复用
+
+    参数：
+    defaults : 图表的默认配置
+    """
+    if isinstance(defaults, FrozenConfig):
+        return defaults
+    cached = _FROZEN_DEFAULTS.get(id(defaults))
+    if cached is None or cached[0] is not defaults:
+        with _FROZEN_DEFAULTS_LOCK:
+            cached = _FROZEN_DEFAULTS[id(defaults)] = (defaults, freeze(defaults))
+    return cached[1]
+
+
+_FROZEN_DEFAULTS: Dict[int, Tuple[Mapping, FrozenConfig]] = {}
+_FROZEN_DEFAULTS_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _resolve_cached(chart: str, defaults: FrozenConfig, config: FrozenConfig, overrides: FrozenConfig) -> FrozenConfig:
+    return _resolve(defaults, config, overrides)
+
+
+def _resolve(defaults: FrozenConfig, config: FrozenConfig, overrides: FrozenConfig) -> FrozenConfig:
+    return FrozenConfig(merge(merge(defaults, config), overrides))
@@ -0,0 +1,309 @@
+# src/daemon.py
+"""
+常驻渲染服务
+启动时一次性导入pandas/matplotlib/pyecharts与全部图表模块并完成字体查找，
+之后在UNIX域套接字上接收图表任务：任务排队后由线程池执行（图表不经过pyplot全局状态，见src/matplot/canvas.py），
+同一数据版本下参数完全相同且尚未完成的任务只渲染一次，单个图表的延迟只剩绘制本身。
+
+协议：每个连接发送一行JSON请求，返回一行JSON结果
+    {"chart": "create_heatmap", "config": {...}, "kwargs": {...}, "dataset": "/path/to/data", "data": "cube"}
+    {"op": "stats"} / {"op": "ping"} / {"op": "shutdown"}
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from config import settings
+from src.config_resolver import resolve_config
+from src.dataset import TemperatureDataset, get_dataset
+from src.registry import CHARTS, ChartSpec, load_chart
+
+
+DATA_KINDS = ("cube", "daily", "frame", "index")
+
+
+class RenderService:
+    """
+    渲染服务（可脱离套接字直接在进程内使用）
+
+    参数：
+    workers : 渲染线程数（默认settings.DAEMON_WORKERS）
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.DAEMON_WORKERS or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0}
+
+    def warm_up(self, dataset_path: Optional[str] = None) -> None:
+        """
+        预热：导入全部图表模块、切换Agg后端、完成字体查找，并可预先加载数据集与立方
+
+        参数：
+        dataset_path : 需要预先加载的数据路径（默认不加载）
+        """
+        import matplotlib
+        matplotlib.use("Agg", force=True)
+        settings.SHOW_FIGURES = False
+
+        for name in CHARTS:
+            load_chart(name)
+
+        from matplotlib import font_manager
+        from src.matplot.canvas import apply_style
+        apply_style()
+        font_manager.findfont(font_manager.FontProperties(family=matplotlib.rcParams["font.sans-serif"]))
+
+        if dataset_path is not None:
+            _load_cube(get_dataset(dataset_path))
+
+    def submit(self, request: Dict[str, Any]) -> Future:
+        """
+        提交图表任务；参数相同且仍在排队或执行中的任务直接复用其结果
+
+        参数：
+        request : 任务描述（chart/config/kwargs/dataset/data）
+        返回：结果Future（结果为chart/status/outputs/seconds/error字典）
+        """
+        chart = request.get("chart")
+        load_chart(chart)
+        data = request.get("data") or CHARTS[chart].data
+        if data not in DATA_KINDS:
+            raise ValueError(f"data参数必须是{'/'.join(DATA_KINDS)}")
+
+        dataset = get_dataset(request.get("dataset"))
+        key = _job_key(chart, data, request, dataset)
+        with self._lock:
+            self._stats["submitted"] += 1
+            future = self._pending.get(key)
+            if future is not None:
+                self._stats["deduplicated"] += 1
+                return future
+            future = self._executor.submit(self._render, chart, data, request, dataset)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._finish(key))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """服务计数（提交/去重/完成/失败/排队中）"""
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending), "workers": self.workers}
+
+    def close(self) -> None:
+        """等待已提交的任务完成并关闭线程池"""
+        self._executor.shutdown(wait=True)
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def _render(self, chart: str, data: str, request: Dict[str, Any], dataset: TemperatureDataset) -> Dict[str, Any]:
+        """在渲染线程中执行单个图表任务，异常转为失败结果"""
+        started = time.perf_counter()
+        result = {"chart": chart, "status": "ok", "outputs": [], "error": None}
+        try:
+            func = load_chart(chart)
+            config = request.get("config") or {}
+            kwargs = dict(request.get("kwargs") or {})
+            output = func(config=config, **_chart_input(dataset, data), **kwargs)
+            result["outputs"] = _outputs(chart, CHARTS[chart], output, config, kwargs)
+        except Exception:
+            result["status"] = "error"
+            result["error"] = traceback.format_exc()
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        with self._lock:
+            self._stats["completed" if result["status"] == "ok" else "failed"] += 1
+        return result
+
+
+def _job_key(chart: str, data: str, request: Dict[str, Any], dataset: TemperatureDataset) -> str:
+    """任务去重键：图表、输入、参数与数据版本（按文件状态确定，不读取数据内容）"""
+    version, _ = dataset.version
+    payload = json.dumps(
+        [chart, data, request.get("config"), request.get("kwargs"), dataset.path, version],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _load_cube(dataset: TemperatureDataset):
+    """数据集的共享预聚合立方（与main.py相同的缓存与流式设置）"""
+    return dataset.cube(
+        cache_dir=settings.CACHE_DIR,
+        streaming=settings.STREAMING,
+        chunk_rows=settings.STREAM_CHUNK_ROWS
+    )
+
+
+def _chart_input(dataset: TemperatureDataset, data: str) -> Dict[str, Any]:
+    """按输入类型准备create_*函数的数据参数"""
+    if data == "cube":
+        return {"df": None, "cube": _load_cube(dataset)}
+    if data == "daily":
+        return {"df": _load_cube(dataset).daily_frame()}
+    if data == "index":
+        return {"df": dataset.index}
+    return {"df": dataset.frame}
+
+
+def _outputs(chart: str, spec: ChartSpec, output: Any, config: Dict[str, Any], kwargs: Dict[str, Any]) -> list:
+    """图表的输出文件列表"""
+    if spec.default_config is None:
+        return [str(output)] if isinstance(output, str) else []
+    default = getattr(importlib.import_module(spec.module), spec.default_config)
+    final_config = resolve_config(chart, default, config, kwargs)
+    if not final_config.get("output_path"):
+        return []
+    return [f"{final_config['output_path']}/{final_config['filename']}.html"]
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """处理一个连接：读取一行JSON请求，写回一行JSON结果"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+            op = request.get("op", "render")
+            if op == "render":
+                response = self.server.service.submit(request).result()
+            elif op == "stats":
+                response = {"status": "ok", **self.server.service.stats()}
+            elif op == "ping":
+                response = {"status": "ok"}
+            elif op == "shutdown":
+                response = {"status": "ok"}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                raise ValueError(f"未知操作: {op}")
+        except Exception as exc:
+            response = {"status": "error", "error": f"{type(exc).__name__}: {exc}"}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class RenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """UNIX域套接字渲染服务（每个连接一个线程，渲染在服务的线程池中执行）"""
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: RenderService):
+        self.service = service
+        super().__init__(socket_path, _RequestHandler)
+
+
+def serve(
+        socket_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        preload: Optional[str] = None) -> None:
+    """
+    启动渲染服务（阻塞直到收到shutdown请求）
+
+    参数：
+    socket_path : 套接字路径（默认settings.DAEMON_SOCKET）
+    workers : 渲染线程数（默认settings.DAEMON_WORKERS）
+    preload : 启动时预先加载的数据路径（可选）
+    """
+    socket_path = socket_path or settings.DAEMON_SOCKET
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(socket_path):
+        # 清理上次异常退出遗留的套接字文件（仍有服务在监听时拒绝启动）
+        if ping(socket_path):
+            raise RuntimeError(f"渲染服务已在运行: {socket_path}")
+        os.unlink(socket_path)
+
+    service = RenderService(workers)
+    service.warm_up(preload)
+    try:
+        with RenderServer(socket_path, service) as server:
+            server.serve_forever()
+    finally:
+        service.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def request(payload: Dict[str, Any], socket_path: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    向渲染服务发送一个请求并等待结果
+
+    参数：
+    payload : 请求内容（图表任务或{"op": ...}）
+    socket_path : 套接字路径（默认settings.DAEMON_SOCKET）
+    timeout : 超时秒数（默认一直等待）
+    返回：服务返回的结果字典
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path or settings.DAEMON_SOCKET)
+        client.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reader:
+            return json.loads(reader.readline())
+
+
+def render_chart(
+        chart: str,
+        config: Optional[Dict[str, Any]] = None,
+        dataset: Optional[str] = None,
+        socket_path: Optional[str] = None,
+        data: Optional[str] = None,
+        **kwargs) -> Dict[str, Any]:
+    """
+    请求渲染服务生成一个图表
+
+    参数：
+    chart : create_*函数名（见CHARTS）
+    config : 图表配置
+    dataset : 数据路径（默认服务端的settings.DATA_PATH）
+    socket_path : 套接字路径（默认settings.DAEMON_SOCKET）
+    data : 输入类型（默认按图表选择，见ChartSpec）
+    kwargs : 传给create_*函数的其他参数（需可JSON序列化）
+    返回：结果字典（status/outputs/seconds/error）
+    """
+    payload = {"chart": chart, "config": config or {}, "kwargs": kwargs, "dataset": dataset, "data": data}
+    return request(payload, socket_path)
+
+
+def ping(socket_path: Optional[str] = None) -> bool:
+    """渲染服务是否在运行"""
+    try:
+        return request({"op": "ping"}, socket_path, timeout=5)["status"] == "ok"
+    except OSError:
+        return False
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="常驻渲染服务")
+    parser.add_argument("command", choices=["serve", "render", "stats", "stop"], help="启动服务/提交图表/查看计数/停止服务")
+    parser.add_argument("chart", nargs="?", help="render时的create_*函数名")
+    parser.add_argument("--socket", default=None, help="套接字路径（默认settings.DAEMON_SOCKET）")
+    parser.add_argument("--workers", type=int, default=None, help="渲染线程数")
+    parser.add_argument("--preload", default=None, help="启动时预先加载的数据路径")
+    parser.add_argument("--config", default=None, help="render时的图表配置（JSON）")
+    parser.add_argument("--dataset", default=None, help="render时的数据路径")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "serve":
+        serve(args.socket, args.workers, args.preload)
+    elif args.command == "render":
+        config = json.loads(args.config) if args.config else None
+        print(json.dumps(render_chart(args.chart, config, args.dataset, args.socket), ensure_ascii=False, indent=2))
+    elif args.command == "stats":
+        print(json.dumps(request({"op": "stats"}, args.socket), ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(request({"op": "shutdown"}, args.socket), ensure_ascii=False))
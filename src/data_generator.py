@@ -1,12 +1,31 @@
 # src/data_generator.py
+from typing import Optional
 from config import settings
-from data.temperature import generate_temperature_data
+from src.storage import detect_format
+from data.temperature import write_temperature_data, write_temperature_parallel
 
-def generate_and_save_data():
-    """生成并保存模拟温度数据"""
-    df = generate_temperature_data()
-    df.to_csv(settings.DATA_PATH, index=False)
-    print(f"数据已保存至：{settings.DATA_PATH}")
+def generate_and_save_data(
+        path: Optional[str] = None,
+        fmt: Optional[str] = None,
+        workers: Optional[int] = None,
+        **kwargs):
+    """
+    生成并保存模拟温度数据（逐块写入，不在内存中保留完整数据集）
+
+    参数：
+    path : 输出路径（默认settings.DATA_PATH）
+    fmt : 存储格式csv/columnar（默认按路径推断：.csv为CSV，否则为列式目录）
+    workers : 指定时使用多进程并行生成（仅列式格式，各进程写入同一目录的不同行范围）
+    kwargs : 透传给write_temperature_data（start/end/freq/stations/seed/chunk_rows）
+    """
+    path = path or settings.DATA_PATH
+    if workers:
+        if detect_format(path, fmt) != "columnar":
+            raise ValueError("并行生成仅支持列式格式")
+        rows = write_temperature_parallel(path, workers, **kwargs)
+    else:
+        rows = write_temperature_data(path, fmt, **kwargs)
+    print(f"数据已保存至：{path}（{rows}行）")
 
 if __name__ == "__main__":
     generate_and_save_data()
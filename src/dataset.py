@@ -0,0 +1,404 @@
+# src/dataset.py
+"""
+温度数据集上下文
+数据文件只解析一次，所有create_*函数共享同一份只读数据框；
+数据版本由文件状态（大小、修改时间）与列式元数据确定，变化时自动重新加载；
+内容哈希只在需要内容指纹时按需计算，每个版本只计算一次；
+加载的数据框以数据版本与筛选条件登记为输出缓存的指纹（见src/render_cache.py），渲染缓存不读取数据内容。
+支持CSV文件与列式目录（见src/storage.py，内存映射加载）；
+数据框按需加载，只使用流式聚合立方（见src/streaming.py）时不会把整个文件读入内存；
+可附带筛选条件（时间窗口/站点），数据框与立方都只包含筛选后的数据
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from src.aggregation import AggregationCube
+from src.dtypes import apply_dtype_policy, dtype_policy, memory_report
+from src.render_cache import code_version, register_frame
+from src.storage import data_files, is_columnar, load_columnar
+from src.streaming import stream_cube
+from src.time_index import TimeIndex
+
+
+class DataSelection(NamedTuple):
+    """
+    数据筛选条件
+
+    属性：
+    start : 起始时间（包含，None表示不限）
+    end : 结束时间（不包含，None表示不限）
+    stations : 保留的站点（None表示全部站点）
+    station_col : 站点列名称（默认'station'）
+    """
+    start: Optional[str] = None
+    end: Optional[str] = None
+    stations: Optional[Tuple[str, ...]] = None
+    station_col: str = "station"
+
+    @property
+    def tag(self) -> str:
+        """筛选条件的短哈希（用于区分缓存文件）"""
+        digest = hashlib.blake2b(repr(tuple(self)).encode("utf-8"), digest_size=6)
+        return digest.hexdigest()
+
+    def apply(self, df: pd.DataFrame, time_col: str = "timestamp") -> pd.DataFrame:
+        """
+        按时间窗口与站点筛选数据框（也用于流式聚合的数据块）
+
+        参数：
+        df : 数据框或数据块
+        time_col : 时间列名称（默认'timestamp'）
+        """
+        mask = np.ones(len(df), dtype=bool)
+        if self.start is not None or self.end is not None:
+            times = df[time_col]
+            if not pd.api.types.is_datetime64_any_dtype(times):
+                times = pd.to_datetime(times)
+            ns = times.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            if self.start is not None:
+                mask &= ns >= pd.Timestamp(self.start).value
+            if self.end is not None:
+                mask &= ns < pd.Timestamp(self.end).value
+        if self.stations is not None:
+            if self.station_col not in df.columns:
+                raise ValueError(f"数据中没有站点列{self.station_col}，无法按站点筛选")
+            mask &= df[self.station_col].isin(self.stations).to_numpy()
+        if mask.all():
+            return df
+        return df[mask].reset_index(drop=True)
+
+
+def select(
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        stations: Optional[Sequence[str]] = None,
+        station_col: str = "station") -> Optional[DataSelection]:
+    """
+    构造筛选条件（没有任何条件时返回None）
+
+    参数：
+    start / end : 时间窗口[start, end)
+    stations : 保留的站点
+    station_col : 站点列名称（默认'station'）
+    """
+    if start is None and end is None and not stations:
+        return None
+    return DataSelection(start, end, tuple(stations) if stations else None, station_col)
+
+
+class TemperatureDataset:
+    """
+    温度数据集上下文
+
+    参数：
+    path : 数据文件或列式目录路径（默认settings.DATA_PATH）
+    time_col : 时间列名称（默认'timestamp'）
+    verify_hash : 每次访问都校验内容哈希（适用于修改时间精度不足的文件系统；会读取全部数据）
+    dtype_policy : 加载时使用的类型策略（默认settings.DTYPE_POLICY）
+    selection : 筛选条件（默认使用全部数据，见select()）
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            time_col: str = "timestamp",
+            verify_hash: bool = False,
+            dtype_policy: Optional[dict] = None,
+            selection: Optional[DataSelection] = None):
+        self.path = path or settings.DATA_PATH
+        self.time_col = time_col
+        self.verify_hash = verify_hash
+        self.dtype_policy = dtype_policy
+        self.selection = selection
+        self._frame = None
+        self._stat_key = None
+        self._version = None
+        self._digest = None
+        self._cubes = {}
+        self._index = None
+        self._lock = threading.RLock()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """返回只读数据框（浅视图，调用方新增列不会影响共享数据）"""
+        with self._lock:
+            return self._loaded_frame().copy(deep=False)
+
+    @property
+    def index(self) -> TimeIndex:
+        """返回时间索引（按年/月/窗口二分切片，日历字段只计算一次）"""
+        with self._lock:
+            frame = self._loaded_frame()
+            if self._index is None:
+                self._index = TimeIndex(frame.copy(deep=False), self.time_col)
+            return self._index
+
+    @property
+    def frame_loaded(self) -> bool:
+        """当前数据版本的数据框是否已加载"""
+        with self._lock:
+            self._refresh()
+            return self._frame is not None
+
+    @property
+    def fingerprint(self) -> str:
+        """当前数据文件的内容哈希（首次访问时读取全部文件计算，同一数据版本只计算一次）"""
+        with self._lock:
+            self._refresh()
+            if self._digest is None:
+                self._digest = _file_digest(self.path)
+            return self._digest
+
+    @property
+    def version(self) -> Tuple[str, tuple]:
+        """当前数据版本（版本标识, 文件状态），不读取数据内容"""
+        with self._lock:
+            self._refresh()
+            return self._version, self._stat_key
+
+    @property
+    def computed_fingerprint(self) -> Optional[str]:
+        """已计算的内容哈希（尚未计算时为None，不触发计算）"""
+        with self._lock:
+            self._refresh()
+            return self._digest
+
+    def cached_cubes(self) -> Dict[tuple, AggregationCube]:
+        """当前数据版本已构建的立方（键为(版本标识, 数值列, 是否流式)）"""
+        with self._lock:
+            self._refresh()
+            return dict(self._cubes)
+
+    def preload(
+            self,
+            frame: Optional[pd.DataFrame],
+            version: str,
+            stat_key: tuple,
+            cubes: Dict[tuple, AggregationCube],
+            digest: Optional[str] = None) -> None:
+        """
+        直接填入已加载的数据（如工作进程从共享内存附加的数据），文件状态不变时不再解析
+
+        参数：
+        frame : 只读数据框（None表示需要时再从文件加载）
+        version / stat_key : 该数据对应的版本标识与文件状态
+        cubes : 已构建的立方
+        digest : 已计算的内容哈希（None表示需要时再计算）
+        """
+        with self._lock:
+            self._frame = frame
+            if frame is not None:
+                register_frame(frame, self._frame_tag(version))
+            self._version = version
+            self._digest = digest
+            self._stat_key = stat_key
+            self._cubes = dict(cubes)
+            self._index = None
+
+    def memory_report(self) -> pd.DataFrame:
+        """已加载数据（含时间索引缓存的日历字段）的逐列内存占用"""
+        with self._lock:
+            return memory_report(self._index if self._index is not None else self._loaded_frame())
+
+    def cube(
+            self,
+            value_col: str = "temperature",
+            cache_dir: Optional[str] = None,
+            streaming: bool = False,
+            chunk_rows: int = 1_000_000) -> AggregationCube:
+        """
+        返回预聚合立方（每个数据版本只计算一次）
+
+        参数：
+        value_col : 数值列名称（默认'temperature'）
+        cache_dir : 持久化目录；指定时按数据版本、代码版本与类型策略复用磁盘上的立方
+        streaming : 是否分块流式聚合（不加载完整数据框，分位数由直方图估计）
+        chunk_rows : 流式聚合的每块行数（默认100万行）
+        """
+        with self._lock:
+            self._refresh()
+            key = (self._version, value_col, streaming)
+            if key not in self._cubes:
+                cube_path = None
+                if cache_dir:
+                    suffix = "_stream" if streaming else ""
+                    if self.selection is not None:
+                        suffix += f"_{self.selection.tag}"
+                    cube_path = os.path.join(
+                        cache_dir, f"cube_{self._version}_{value_col}_{self._cube_tag()}{suffix}.pkl"
+                    )
+                if cube_path and os.path.exists(cube_path):
+                    cube = AggregationCube.load(cube_path)
+                else:
+                    if streaming:
+                        cube = stream_cube(self.path, self.time_col, value_col, chunk_rows, self._select)
+                    else:
+                        cube = AggregationCube.build(self.index, self.time_col, value_col)
+                    if cube_path:
+                        cube.save(cube_path)
+                self._cubes[key] = cube
+            return self._cubes[key]
+
+    def _frame_tag(self, version: str) -> str:
+        """已加载数据框的版本标识：数据版本、筛选条件与类型策略的短哈希（同一版本的数据框内容相同）"""
+        selection = self.selection.tag if self.selection is not None else None
+        policies = [dtype_policy(self.dtype_policy), dtype_policy()]
+        payload = json.dumps([version, selection, self.time_col, policies], sort_keys=True, default=str)
+        return "dataset:" + hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _cube_tag(self) -> str:
+        """持久化立方的格式标识：代码版本（立方结构与聚合逻辑）与生效的类型策略（加载与派生字段）的短哈希"""
+        policies = [dtype_policy(self.dtype_policy), dtype_policy()]
+        payload = json.dumps([code_version(), policies], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=6).hexdigest()
+
+    def reload(self) -> pd.DataFrame:
+        """强制重新解析数据文件"""
+        with self._lock:
+            self._version = None
+            self._stat_key = None
+            return self.frame
+
+    def _refresh(self):
+        """按文件状态（verify_hash时另加内容哈希）判断数据是否变化，变化时丢弃已加载的数据框、立方与内容哈希"""
+        stat_key = _stat_key(self.path)
+        digest = _file_digest(self.path) if self.verify_hash else None
+        if self._version is not None and stat_key == self._stat_key and digest in (None, self._digest):
+            return
+
+        self._frame = None
+        self._cubes = {}
+        self._index = None
+        self._stat_key = stat_key
+        self._digest = digest
+        self._version = _version_tag(self.path, stat_key, digest)
+
+    def _loaded_frame(self) -> pd.DataFrame:
+        """返回当前版本的数据框（首次访问时解析）"""
+        self._refresh()
+        if self._frame is None:
+            self._frame = self._load()
+            register_frame(self._frame, self._frame_tag(self._version))
+        return self._frame
+
+    def _load(self) -> pd.DataFrame:
+        """解析数据文件并校验时间列"""
+        if is_columnar(self.path):
+            df = load_columnar(self.path, mmap=True)
+        else:
+            df = pd.read_csv(self.path, parse_dates=[self.time_col])
+        df = normalize_timestamps(df, self.time_col)
+        df = apply_dtype_policy(df, self.time_col, self.dtype_policy)
+        return _freeze(self._select(df))
+
+    def _select(self, df: pd.DataFrame) -> pd.DataFrame:
+        """应用筛选条件"""
+        if self.selection is None:
+            return df
+        return self.selection.apply(df, self.time_col)
+
+
+def normalize_timestamps(df: pd.DataFrame, time_col: str = "timestamp") -> pd.DataFrame:
+    """
+    校验并规范化时间列
+
+    参数：
+    df : 原始数据框
+    time_col : 时间列名称（默认'timestamp'）
+    返回：时间列为无时区datetime64且按时间升序的数据框
+    """
+    timestamps = original = df[time_col]
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, errors="coerce")
+    if timestamps.isna().any():
+        raise ValueError(f"时间列{time_col}包含无法解析的值")
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    if timestamps is not original:
+        df[time_col] = timestamps
+
+    if not timestamps.is_monotonic_increasing:
+        df = df.sort_values(time_col, kind="stable").reset_index(drop=True)
+    return df
+
+
+def _freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """将各列底层数组设为只读（内存映射列保持零拷贝，分类列冻结其整数编码）"""
+    frozen = {}
+    for col in df.columns:
+        values = df[col].array
+        if isinstance(values, pd.Categorical):
+            frozen[col] = pd.Categorical.from_codes(_readonly(values.codes), dtype=values.dtype)
+        else:
+            frozen[col] = _readonly(np.asarray(values))
+    return pd.DataFrame(frozen, copy=False)
+
+
+def _readonly(values: np.ndarray) -> np.ndarray:
+    """返回数组的只读视图"""
+    if values.flags.writeable:
+        values = values.view()
+        values.flags.writeable = False
+    return values
+
+
+def _stat_key(path: str) -> Tuple[Tuple[str, int, int], ...]:
+    """各数据文件的大小与修改时间"""
+    key = []
+    for file in data_files(path):
+        stat = os.stat(file)
+        key.append((os.path.relpath(file, path), stat.st_size, stat.st_mtime_ns))
+    return tuple(key)
+
+
+def _version_tag(path: str, stat_key: tuple, digest: Optional[str] = None) -> str:
+    """数据版本标识：文件状态、列式元数据（_meta.json）与可选内容哈希的短哈希，不读取数据文件"""
+    version = hashlib.blake2b(repr((stat_key, digest)).encode("utf-8"), digest_size=16)
+    for file in data_files(path):
+        if file.endswith(".json"):
+            with open(file, "rb") as f:
+                version.update(f.read())
+    return version.hexdigest()
+
+
+def _file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """流式计算数据文件（或列式目录全部文件）的内容哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    for file in data_files(path):
+        digest.update(os.path.relpath(file, path).encode("utf-8"))
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+_DATASETS: Dict[Tuple[str, str], TemperatureDataset] = {}
+_DATASETS_LOCK = threading.Lock()
+
+
+def get_dataset(path: Optional[str] = None, time_col: str = "timestamp") -> TemperatureDataset:
+    """获取（或创建）指定路径的共享数据集上下文"""
+    key = (os.path.abspath(path or settings.DATA_PATH), time_col)
+    with _DATASETS_LOCK:
+        if key not in _DATASETS:
+            _DATASETS[key] = TemperatureDataset(key[0], time_col=time_col)
+        return _DATASETS[key]
+
+
+def register_dataset(dataset: TemperatureDataset) -> None:
+    """注册（或替换）指定路径的共享数据集上下文"""
+    key = (os.path.abspath(dataset.path), dataset.time_col)
+    with _DATASETS_LOCK:
+        _DATASETS[key] = dataset
+
+
+def load_dataset(path: Optional[str] = None, time_col: str = "timestamp") -> pd.DataFrame:
+    """加载共享只读数据框"""
+    return get_dataset(path, time_col).frame
@@ -0,0 +1,109 @@
+# src/dtypes.py
+"""
+紧凑数据类型策略
+数值列使用float32、日历字段使用int8/int16、字符串列使用分类类型，
+策略在settings.DTYPE_POLICY中配置，加载数据、计算日历字段与派生矩阵时统一套用
+"""
+import mmap
+from typing import TYPE_CHECKING, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+if TYPE_CHECKING:
+    from src.time_index import TimeIndex
+
+
+def dtype_policy(policy: Optional[dict] = None) -> dict:
+    """返回生效的类型策略（默认settings.DTYPE_POLICY）"""
+    return settings.DTYPE_POLICY if policy is None else policy
+
+
+def float_dtype(policy: Optional[dict] = None) -> Optional[np.dtype]:
+    """数值列与派生矩阵的浮点类型（None表示保持原类型）"""
+    name = dtype_policy(policy).get("float")
+    return np.dtype(name) if name else None
+
+
+def calendar_dtype(name: str, policy: Optional[dict] = None) -> Optional[np.dtype]:
+    """日历字段的整数类型（None表示保持原类型）"""
+    dtype = (dtype_policy(policy).get("calendar") or {}).get(name)
+    return np.dtype(dtype) if dtype else None
+
+
+def apply_dtype_policy(
+        df: pd.DataFrame,
+        time_col: str = "timestamp",
+        policy: Optional[dict] = None) -> pd.DataFrame:
+    """
+    按类型策略转换数据框（已是目标类型的列直接引用，不产生拷贝）
+
+    参数：
+    df : 原始数据框
+    time_col : 时间列名称（默认'timestamp'，保持datetime64）
+    policy : 类型策略（默认settings.DTYPE_POLICY）
+    """
+    policy = dtype_policy(policy)
+    target_float = float_dtype(policy)
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        if col == time_col:
+            continue
+        if target_float is not None and pd.api.types.is_float_dtype(values) and values.dtype != target_float:
+            converted[col] = values.astype(target_float)
+        elif policy.get("category") and (
+                pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+            converted[col] = values.astype("category")
+
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for col, values in converted.items():
+        df[col] = values
+    return df
+
+
+def memory_report(data: Union[pd.DataFrame, "TimeIndex"]) -> pd.DataFrame:
+    """
+    逐列内存占用报告
+
+    参数：
+    data : 数据框或时间索引（时间索引同时统计已缓存的日历字段）
+    返回：以列名为索引的数据框（dtype/bytes/MB/mmap），最后一行为合计
+    """
+    arrays = {}
+    frame = data if isinstance(data, pd.DataFrame) else data.frame
+    for col in frame.columns:
+        arrays[col] = frame[col].array
+    if not isinstance(data, pd.DataFrame):
+        for name, values in data._fields.items():
+            arrays[f"<{name}>"] = values
+
+    rows = []
+    for name, values in arrays.items():
+        if isinstance(values, pd.Categorical):
+            nbytes = values.codes.nbytes + values.categories.memory_usage(deep=True)
+            mapped = _is_mapped(values.codes)
+        else:
+            array = np.asarray(values)
+            nbytes = pd.Series(values, copy=False).memory_usage(index=False, deep=True)
+            mapped = _is_mapped(array)
+        rows.append({"column": name, "dtype": str(values.dtype), "bytes": int(nbytes), "mmap": mapped})
+
+    report = pd.DataFrame(rows, columns=["column", "dtype", "bytes", "mmap"]).set_index("column")
+    report.loc["total"] = ["", int(report["bytes"].sum()), bool(report["mmap"].all())]
+    report["bytes"] = report["bytes"].astype(np.int64)
+    report["MB"] = (report["bytes"] / 2 ** 20).round(3)
+    return report
+
+
+def _is_mapped(array: np.ndarray) -> bool:
+    """数组是否由内存映射文件支撑（沿视图链向上查找）"""
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return isinstance(array, mmap.mmap)
@@ -1,13 +1,12 @@
 # src/matplot/area_plot.py
 from config.visualization_config import MATPLOT_AREA_CONFIG
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from pylab import mpl
-
-mpl.rcParams["font.sans-serif"] = ["SimHei"]
-mpl.rcParams["axes.unicode_minus"] = False
+from matplotlib.figure import Figure
+from src.matplot.canvas import new_figure, finish_figure, output_path
+from src.config_resolver import resolve_config
+from src.render_cache import lookup_render
 
 
 def create_area_plot(
@@ -16,7 +15,9 @@ def create_area_plot(
         time_col: str = "timestamp",
         value_col: str = "temperature",
         show: bool = False,
-        **kwargs) -> None:
+        return_figure: bool = False,
+        use_cache: bool = False,
+        **kwargs) -> Union[Figure, str, None]:
     """
     创建气温面积图
 
@@ -26,11 +27,13 @@ def create_area_plot(
     time_col : 时间列名称（默认'timestamp'）
     value_col : 数值列名称（默认'temperature'）
     show : 是否显示图表（默认False）
+    return_figure : 是否返回Figure对象而非图片路径（默认False）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染，直接返回已有图片路径）
     kwargs : 支持任意配置项的覆盖
+    返回：保存的图片路径（未保存时为None），return_figure为True时返回Figure
     """
     # 合并配置参数
-    final_config = {**MATPLOT_AREA_CONFIG, **(config or {})}
-    final_config = _update_nested_dict(final_config, kwargs)
+    final_config = resolve_config("create_area_plot", MATPLOT_AREA_CONFIG, config, kwargs)
 
     # 解包配置参数
     fig_params = final_config["figure"]
@@ -40,12 +43,18 @@ def create_area_plot(
     legend_params = final_config["legend"]
     output_params = final_config["output"]
 
-    # 创建画布
-    plt.figure(
-        figsize=fig_params["figsize"],
-        dpi=fig_params["dpi"]
+    # 输出缓存
+    record = lookup_render(
+        "create_area_plot", final_config, df, [output_path(output_params)],
+        enabled=use_cache and not (show or return_figure),
+        time_col=time_col, value_col=value_col
     )
-    ax = plt.gca()
+    if record.fresh:
+        return record.output
+
+    # 创建画布
+    fig = new_figure(fig_params["figsize"], fig_params["dpi"], show)
+    ax = fig.add_subplot()
 
     # 处理数据
     dates = pd.to_datetime(df[time_col])
@@ -75,29 +84,12 @@ def create_area_plot(
     ax.xaxis.set_major_formatter(formatter)
 
     # 刻度设置
-    plt.xticks(rotation=axis_params["rotation"], ha='right')
+    ax.tick_params(axis='x', labelrotation=axis_params["rotation"])
     ax.tick_params(axis='both', labelsize=text_params.get("tick_fontsize"))
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
 
-    # 保存输出
-    filename = output_params.get("filename")
-    if output_params["save_path"]:
-        plt.savefig(
-            f"{output_params['save_path']}/temperature_area_plot.png",
-            bbox_inches='tight',
-            dpi=output_params.get("save_dpi", 300)
-        )
-
-    # 显示控制
-    if show:
-        plt.show()
-    plt.close()
-
-
-def _update_nested_dict(original: dict, updates: dict) -> dict:
-    """递归更新嵌套字典"""
-    for key, value in updates.items():
-        if isinstance(value, dict) and key in original:
-            original[key] = _update_nested_dict(original[key], value)
-        else:
-            original[key] = value
-    return original
\ No newline at end of file
+    # 保存输出与显示控制
+    output_file = finish_figure(fig, output_params, show)
+    record.store()
+    return fig if return_figure else output_file
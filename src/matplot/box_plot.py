@@ -1,13 +1,15 @@
 # src/matplot/box_plot.py
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.artist import setp
+from matplotlib.figure import Figure
 import calendar
 from config.visualization_config import MATPLOT_BOX_CONFIG
-from pylab import mpl
-
-mpl.rcParams["font.sans-serif"] = ["SimHei"]
-mpl.rcParams["axes.unicode_minus"] = False
+from src.aggregation import AggregationCube, box_stats
+from src.time_index import as_time_index
+from src.matplot.canvas import new_figure, finish_figure, output_path
+from src.config_resolver import resolve_config
+from src.render_cache import lookup_render
 
 
 def create_box_plot(
@@ -17,22 +19,28 @@ def create_box_plot(
         value_col: str = "temperature",
         group_by: str = "month",  # 分组方式：month/day/hour
         show: bool = False,
-        **kwargs) -> None:
+        cube: Optional[AggregationCube] = None,
+        return_figure: bool = False,
+        use_cache: bool = False,
+        **kwargs) -> Union[Figure, str, None]:
     """
     创建气温箱线图
 
     参数：
-    df : 包含时间序列数据的数据框
+    df : 包含时间序列数据的数据框（提供cube时可为None）
     config : 自定义配置字典（可选）
     time_col : 时间列名称（默认'timestamp'）
     value_col : 数值列名称（默认'temperature'）
     group_by : 数据分组方式（month/day/hour）
     show : 是否显示图表（默认False）
+    cube : 预聚合立方（可选，提供时直接复用其中的箱线图统计量）
+    return_figure : 是否返回Figure对象而非图片路径（默认False）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染，直接返回已有图片路径）
     kwargs : 支持任意配置项的覆盖
+    返回：保存的图片路径（未保存时为None），return_figure为True时返回Figure
     """
     # 合并配置参数
-    final_config = {**MATPLOT_BOX_CONFIG, **(config or {})}
-    final_config = _update_nested_dict(final_config, kwargs)
+    final_config = resolve_config("create_box_plot", MATPLOT_BOX_CONFIG, config, kwargs)
 
     # 解包配置参数
     fig_params = final_config["figure"]
@@ -41,40 +49,41 @@ def create_box_plot(
     text_params = final_config["text"]
     output_params = final_config["output"]
 
-    # 创建画布
-    plt.figure(
-        figsize=fig_params["figsize"],
-        dpi=fig_params["dpi"]
+    # 输出缓存
+    record = lookup_render(
+        "create_box_plot", final_config, cube if cube is not None else df, [output_path(output_params)],
+        enabled=use_cache and not (show or return_figure),
+        group_by=group_by, time_col=time_col, value_col=value_col
     )
-    ax = plt.gca()
+    if record.fresh:
+        return record.output
 
-    # 数据处理
-    df = df.copy()
-    df[time_col] = pd.to_datetime(df[time_col])
+    # 创建画布
+    fig = new_figure(fig_params["figsize"], fig_params["dpi"], show)
+    ax = fig.add_subplot()
 
     # 根据分组方式创建分组标签
     if group_by == "month":
-        df["group"] = df[time_col].dt.month
         labels = [calendar.month_abbr[i] for i in range(1, 13)]
         xlabel = "月份"
     elif group_by == "day":
-        df["group"] = df[time_col].dt.day
         labels = list(range(1, 32))
         xlabel = "日期"
     elif group_by == "hour":
-        df["group"] = df[time_col].dt.hour
         labels = [f"{i:02d}:00" for i in range(24)]
         xlabel = "小时"
     else:
         raise ValueError("group_by参数必须是month/day/hour")
 
-    # 准备箱线图数据
-    grouped = df.groupby("group")[value_col].apply(list)
-    data = [grouped[i] for i in sorted(grouped.index)]
+    # 准备箱线图统计量
+    if cube is not None:
+        stats = cube.box_stats(group_by)
+    else:
+        stats = box_stats(as_time_index(df, time_col, (value_col,)), value_col, group_by)
 
     # 绘制箱线图
-    box = ax.boxplot(
-        data,
+    box = ax.bxp(
+        stats,
         patch_artist=box_params.get("patch_artist", True),
         showmeans=box_params.get("show_means", True),
         showfliers=box_params.get("show_fliers", True),
@@ -88,7 +97,7 @@ def create_box_plot(
             patch.set_alpha(box_params.get("alpha",0.8))
 
     for element in ['whiskers', 'caps', 'medians']:
-        plt.setp(box[element], color=box_params.get("edgecolor", "#2c3e50"), linewidth=box_params.get("linewidth", 1.5))
+        setp(box[element], color=box_params.get("edgecolor", "#2c3e50"), linewidth=box_params.get("linewidth", 1.5))
 
     for flier in box['fliers']:
         flier.set(marker=box_params.get("flier_marker", "o"),
@@ -107,28 +116,10 @@ def create_box_plot(
             alpha=axis_params["grid_style"]["alpha"])
 
     # 刻度设置
-    plt.xticks(rotation=axis_params["rotation"], fontsize=text_params.get("tick_fontsize", 12))
-    plt.yticks(fontsize=text_params.get("tick_fontsize", 12))
-
-    # 保存输出
-    if output_params["save_path"]:
-        plt.savefig(
-            f"{output_params['save_path']}/{output_params['filename']}.png",
-            bbox_inches='tight',
-            dpi=output_params.get("save_dpi", 300)
-        )
-
-    # 显示控制
-    if show:
-        plt.show()
-    plt.close()
-
-
-def _update_nested_dict(original: dict, updates: dict) -> dict:
-    """递归更新嵌套字典"""
-    for key, value in updates.items():
-        if isinstance(value, dict) and key in original:
-            original[key] = _update_nested_dict(original[key], value)
-        else:
-            original[key] = value
-    return original
+    ax.tick_params(axis='x', labelrotation=axis_params["rotation"], labelsize=text_params.get("tick_fontsize", 12))
+    ax.tick_params(axis='y', labelsize=text_params.get("tick_fontsize", 12))
+
+    # 保存输出与显示控制
+    output_file = finish_figure(fig, output_params, show)
+    record.store()
+    return fig if return_figure else output_file
@@ -1,10 +1,28 @@
 # src/matplot/calendar_heatmap.py
-from typing import Optional, Dict, Any
+"""
+Matplotlib日历热力图
+按周排列：每列为一周（周一至周日自上而下），全年约53列，月份标签标在每月第一天所在的列上；
+每个方块为当天按heatmap.aggregate聚合的取值（默认日均值），
+全部方块合并为一个pcolormesh，日期文字合并为一个PathCollection
+"""
+from functools import lru_cache
+from typing import Optional, Dict, Any, Sequence, Tuple, Union
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-from matplotlib.patches import Rectangle
+from matplotlib.figure import Figure
+from matplotlib.collections import PathCollection
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D
 from config.visualization_config import MATPLOT_CALENDAR_CONFIG
+from src.aggregation import DAILY_AGGREGATES, DAY_NS, AggregationCube, _group_table, daily_aggregate
+from src.time_index import as_time_index
+from src.matplot import styles
+from src.matplot.canvas import new_figure, finish_figure, output_path
+from src.config_resolver import resolve_config
+from src.render_cache import lookup_render
+
+# 星期标签（周一为第0行）
+WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
 
 
 def create_calendar_heatmap(
@@ -12,24 +30,34 @@ def create_calendar_heatmap(
         config: Optional[Dict[str, Any]] = None,
         date_col: str = "timestamp",
         value_col: str = "temperature",
-        year: int = 2024,
+        year: Union[int, Sequence[int]] = 2024,
         show: bool = False,
-        **kwargs) -> None:
+        cube: Optional[AggregationCube] = None,
+        stations: Optional[Sequence[str]] = None,
+        station_col: str = "station",
+        return_figure: bool = False,
+        use_cache: bool = False,
+        **kwargs) -> Union[Figure, str, None]:
     """
-    创建日历热力图
+    创建日历热力图（每个年份/站点一行日历，共用一个颜色条）
 
     参数：
-    df : 包含日期和温度的数据框
+    df : 包含日期和温度的数据框（或src.time_index.TimeIndex，按年二分切片；提供cube时可为None）
     config : 自定义配置字典
     date_col : 日期列名（默认'timestamp'）
     value_col : 温度列名（默认'temperature'）
-    year : 要展示的年份（默认2024）
+    year : 要展示的年份或年份列表（默认2024）
     show : 是否显示图表（默认False）
+    cube : 预聚合立方（可选，提供时直接复用其中的逐日统计表；不支持按站点拆分）
+    stations : 要分别展示的站点列表（默认不区分站点，聚合全部数据）
+    station_col : 站点列名（默认'station'）
+    return_figure : 是否返回Figure对象而非图片路径（默认False）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染，直接返回已有图片路径）
     kwargs : 支持任意配置项的覆盖
+    返回：保存的图片路径（未保存时为None），return_figure为True时返回Figure
     """
     # 合并配置参数
-    final_config = {**MATPLOT_CALENDAR_CONFIG, **(config or {})}
-    final_config = _update_nested_dict(final_config, kwargs)
+    final_config = resolve_config("create_calendar_heatmap", MATPLOT_CALENDAR_CONFIG, config, kwargs)
 
     # 解包配置参数
     fig_params = final_config["figure"]
@@ -37,148 +65,184 @@ def create_calendar_heatmap(
     text_params = final_config["text"]
     output_params = final_config["output"]
 
-    # 数据预处理
-    df = _prepare_calendar_data(df, date_col, value_col, year)
-
-    # 创建画布
-    fig = plt.figure(figsize=fig_params["figsize"], dpi=fig_params["dpi"])
-    ax = fig.add_subplot(111)
-
-    # 绘制日历
-    _draw_calendar(ax, df, year, heatmap_params, text_params)
-
-    # 设置颜色条
-    _add_colorbar(fig, df[value_col], heatmap_params)
-
-    # 保存输出
-    if output_params["save_path"]:
-        plt.savefig(
-            f"{output_params['save_path']}/{output_params['filename']}.png",
-            bbox_inches='tight',
-            dpi=output_params.get("save_dpi", 300)
-        )
-
-    # 显示控制
-    if show:
-        plt.show()
-    plt.close()
-
+    # 输出缓存
+    record = lookup_render(
+        "create_calendar_heatmap", final_config, cube if cube is not None else df, [output_path(output_params)],
+        enabled=use_cache and not (show or return_figure),
+        year=year, stations=stations, station_col=station_col, date_col=date_col, value_col=value_col
+    )
+    if record.fresh:
+        return record.output
 
-def _prepare_calendar_data(df, date_col, value_col, year):
-    """准备日历数据"""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df[df[date_col].dt.year == year]
+    # 数据预处理：每个(站点, 年份)一行逐日取值
+    years = [year] if np.isscalar(year) else list(year)
+    panels = _prepare_calendar_panels(
+        df, date_col, value_col, years, cube, stations, station_col, heatmap_params.get("aggregate", "mean")
+    )
 
-    # 创建完整日期索引
-    full_dates = pd.date_range(start=f"{year}-01-01", end=f"{year}-12-31")
-    return df.set_index(date_col).reindex(full_dates).reset_index()
+    # 创建画布（多行日历按行高扩展）
+    width, height = fig_params["figsize"]
+    if len(panels) > 1:
+        height = fig_params.get("panel_height", 4) * len(panels)
+    fig = new_figure((width, height), fig_params["dpi"], show)
+    axes = fig.subplots(len(panels), 1, squeeze=False)
 
+    # 颜色标准化与颜色映射（进程内缓存）
+    norm = styles.norm(heatmap_params["vmin"], heatmap_params["vmax"])
+    cmap = styles.colormap(heatmap_params["cmap"])
 
-def _draw_calendar(ax, df, year, heatmap_params, text_params):
-    """绘制日历主体"""
-    # 计算每周信息
-    df['week'] = df['index'].dt.isocalendar().week
-    df['day'] = df['index'].dt.day
-    df['weekday'] = df['index'].dt.weekday  # Monday=0
-    df['month'] = df['index'].dt.month
+    # 绘制日历
+    mesh = None
+    for ax, (title, panel_year, values) in zip(axes[:, 0], panels):
+        mesh = _draw_calendar(ax, values, panel_year, cmap, norm, heatmap_params, text_params)
+        if len(panels) > 1:
+            ax.set_title(title, fontsize=text_params.get("title_fontsize", 14), loc="left")
 
-    # 颜色标准化
-    norm = mpl.colors.Normalize(
-        vmin=heatmap_params["vmin"],
-        vmax=heatmap_params["vmax"]
+    # 设置颜色条
+    _add_colorbar(fig, axes[:, 0], mesh, heatmap_params)
+
+    # 保存输出与显示控制
+    output_file = finish_figure(fig, output_params, show)
+    record.store()
+    return fig if return_figure else output_file
+
+
+def _prepare_calendar_panels(df, date_col, value_col, years, cube, stations, station_col, aggregate):
+    """准备每行日历的(标题, 年份, 逐日取值)"""
+    if aggregate not in DAILY_AGGREGATES:
+        raise ValueError(f"aggregate参数必须是{'/'.join(DAILY_AGGREGATES)}")
+    panels = []
+    if stations is None:
+        index = None if cube is not None else as_time_index(df, date_col, (value_col,))
+        for year in years:
+            if cube is not None:
+                full_dates = pd.date_range(start=f"{year}-01-01", end=f"{year}-12-31")
+                values = daily_aggregate(cube.daily.reindex(full_dates), aggregate)
+            else:
+                values = _daily_values(index.year(year), value_col, year, aggregate)[0]
+            panels.append((str(year), year, values))
+        return panels
+
+    if df is None:
+        raise ValueError("按站点展示日历需要提供原始数据df")
+    index = as_time_index(df, date_col, (station_col, value_col))
+    for year in years:
+        daily = _daily_values(index.year(year), value_col, year, aggregate, station_col, stations)
+        panels.extend((f"{station} {year}", year, values) for station, values in zip(stations, daily))
+    return panels
+
+
+def _daily_values(index, value_col, year, aggregate="mean", station_col=None, stations=None) -> np.ndarray:
+    """一次分组求出全年逐日取值（返回站点数×天数矩阵，不区分站点时为1行）"""
+    n_days = _days_in_year(year)
+    n_groups = 1 if stations is None else len(stations)
+    if len(index) == 0:
+        return np.full((n_groups, n_days), np.nan)
+
+    codes = (index.ns - pd.Timestamp(year=year, month=1, day=1).value) // DAY_NS
+    values = index[value_col].to_numpy().astype(np.float64, copy=False)
+    valid = ~np.isnan(values)
+    if stations is not None:
+        station_codes = pd.Categorical(index[station_col], categories=list(stations)).codes.astype(np.int64)
+        valid &= station_codes >= 0
+        codes = station_codes * n_days + codes
+
+    table = _group_table(codes[valid], values[valid], n_groups * n_days)
+    return daily_aggregate(table, aggregate).reshape(n_groups, n_days)
+
+
+def _calendar_layout(year) -> Tuple[np.ndarray, np.ndarray, int]:
+    """全年每天所在的列（周）与行（星期），以及总列数"""
+    first_weekday = pd.Timestamp(year=year, month=1, day=1).weekday()
+    positions = np.arange(_days_in_year(year)) + first_weekday
+    cols, rows = np.divmod(positions, 7)
+    return cols, rows, int(cols[-1]) + 1
+
+
+def _days_in_year(year) -> int:
+    """全年天数"""
+    return 366 if pd.Timestamp(year=year, month=1, day=1).is_leap_year else 365
+
+
+def _draw_calendar(ax, values, year, cmap, norm, heatmap_params, text_params):
+    """绘制一行日历：全部日期方块为一个QuadMesh，日期标签为一个PathCollection"""
+    cols, rows, n_weeks = _calendar_layout(year)
+    grid = np.full((7, n_weeks), np.nan)
+    grid[rows, cols] = values
+
+    mesh = ax.pcolormesh(
+        np.arange(n_weeks + 1),
+        np.arange(8),
+        np.ma.masked_invalid(grid),
+        cmap=cmap,
+        norm=norm,
+        edgecolors="white",
+        linewidth=heatmap_params.get("cell_linewidth", 1.0)
     )
-    cmap = mpl.cm.get_cmap(heatmap_params["cmap"])
-
-    # 绘制每个日期方块
-    for _, row in df.iterrows():
-        if pd.isna(row['temperature']):
-            continue
-
-        # 计算方块位置
-        week_number = row['week'] - df[df['month'] == row['month']]['week'].min()
-        x_pos = (row['month'] - 1) * 3 + week_number // 4.5
-        y_pos = row['weekday']
-
-        # 绘制方块
-        rect = Rectangle(
-            (x_pos, y_pos),
-            width=0.9,
-            height=0.9,
-            facecolor=cmap(norm(row['temperature'])),
-            edgecolor='white'
+
+    # 添加日期标签（只标注有数据的日期）
+    if heatmap_params.get("show_date", True):
+        dates = pd.date_range(start=f"{year}-01-01", periods=len(values), freq="D")
+        has_value = ~np.isnan(values)
+        _add_day_labels(
+            ax,
+            cols[has_value] + 0.5,
+            rows[has_value] + 0.5,
+            dates.day.to_numpy()[has_value],
+            text_params["date_fontsize"],
+            text_params["date_color"]
         )
-        ax.add_patch(rect)
-
-        # 添加日期标签
-        if heatmap_params.get("show_date", True):
-            ax.text(
-                x_pos + 0.45,
-                y_pos + 0.45,
-                str(row['day']),
-                ha='center',
-                va='center',
-                fontsize=text_params["date_fontsize"],
-                color=text_params["date_color"]
-            )
 
     # 设置坐标轴
-    ax.set_xlim(0, 12 * 3)
-    ax.set_ylim(-0.5, 6.5)
-    ax.invert_yaxis()
-
-    # 设置月份标签
-    for month in range(1, 13):
-        ax.text(
-            (month - 1) * 3 + 1.5,
-            -0.3,
-            f"{month}月",
-            ha='center',
-            fontsize=text_params["month_fontsize"]
-        )
+    ax.set_xlim(0, n_weeks)
+    ax.set_ylim(7, -0.8)
+    ax.set_aspect("equal")
+
+    # 设置月份标签（位于每月第一天所在的列）
+    month_starts = pd.date_range(start=f"{year}-01-01", periods=12, freq="MS").dayofyear.to_numpy() - 1
+    for month, col in enumerate(cols[month_starts], start=1):
+        ax.text(col, -0.3, f"{month}月", ha='left', fontsize=text_params["month_fontsize"])
 
     # 设置星期标签
-    weekdays = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-    for i, day in enumerate(weekdays):
-        ax.text(
-            -0.5,
-            i + 0.5,
-            day,
-            ha='right',
-            va='center',
-            fontsize=text_params["weekday_fontsize"]
-        )
+    for i, day in enumerate(WEEKDAYS):
+        ax.text(-0.5, i + 0.5, day, ha='right', va='center', fontsize=text_params["weekday_fontsize"])
 
     # 隐藏坐标轴
     ax.axis('off')
-
-
-def _add_colorbar(fig, values, heatmap_params):
-    """添加颜色条"""
-    norm = mpl.colors.Normalize(
-        vmin=heatmap_params["vmin"],
-        vmax=heatmap_params["vmax"]
-    )
-    cmap = mpl.cm.get_cmap(heatmap_params["cmap"])
-
-    cbar_ax = fig.add_axes(heatmap_params.get("cbar_pos", [0.2, 0.08, 0.6, 0.03]))
-    cb = mpl.colorbar.ColorbarBase(
-        cbar_ax,
-        cmap=cmap,
-        norm=norm,
-        orientation='horizontal'
+    return mesh
+
+
+def _add_day_labels(ax, x, y, days, fontsize, color):
+    """以单个PathCollection批量绘制日期数字（字形路径按点数缩放，位置使用数据坐标）"""
+    paths = [_day_label_path(int(day), fontsize) for day in days]
+    labels = PathCollection(
+        paths,
+        offsets=np.column_stack([x, y]),
+        offset_transform=ax.transData,
+        facecolors=color,
+        edgecolors="none"
     )
+    labels.set_transform(Affine2D().scale(1 / 72) + ax.figure.dpi_scale_trans)
+    ax.add_collection(labels, autolim=False)
+
+
+@lru_cache(maxsize=None)
+def _day_label_path(day: int, fontsize: float):
+    """日期数字的字形路径（以点为单位、中心对齐，同一数字只生成一次）"""
+    path = TextPath((0, 0), str(day), size=fontsize)
+    extents = path.get_extents()
+    center = ((extents.x0 + extents.x1) / 2, (extents.y0 + extents.y1) / 2)
+    return path.transformed(Affine2D().translate(-center[0], -center[1]))
+
+
+def _add_colorbar(fig, axes, mesh, heatmap_params):
+    """添加颜色条（多行日历时放在最后一行下方）"""
+    if len(axes) == 1:
+        cbar_ax = fig.add_axes(heatmap_params.get("cbar_pos", [0.2, 0.08, 0.6, 0.03]))
+        cb = fig.colorbar(mesh, cax=cbar_ax, orientation='horizontal')
+    else:
+        cb = fig.colorbar(mesh, ax=list(axes), orientation='horizontal', shrink=0.6, pad=0.02)
     cb.set_label(
         heatmap_params.get("cbar_label"),
         fontsize=heatmap_params.get("cbar_fontsize")
     )
-
-
-def _update_nested_dict(original: dict, updates: dict) -> dict:
-    """递归更新嵌套字典"""
-    for key, value in updates.items():
-        if isinstance(value, dict) and key in original:
-            original[key] = _update_nested_dict(original[key], value)
-        else:
-            original[key] = value
-    return original
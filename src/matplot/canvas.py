@@ -0,0 +1,88 @@
+# src/matplot/canvas.py
+"""
+画布管理
+不需要弹出窗口时直接创建带Agg画布的Figure，不经过pyplot的"当前图形"全局状态，
+多个线程可以同时渲染各自的图表；只有show=True时才通过pyplot创建以便交互显示。
+中文字体等全局样式在首次创建画布时应用，导入图表模块不修改rcParams
+"""
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import matplotlib as mpl
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from config.visualization_config import MATPLOT_RC_PARAMS
+from src.matplot.styles import rc_params
+
+_STYLE_LOCK = threading.Lock()
+_STYLE_APPLIED = False
+
+
+def apply_style() -> None:
+    """应用MATPLOT_RC_PARAMS（每个进程只应用一次，未安装的字体不写入字体列表）"""
+    global _STYLE_APPLIED
+    with _STYLE_LOCK:
+        if not _STYLE_APPLIED:
+            mpl.rcParams.update(rc_params(MATPLOT_RC_PARAMS))
+            _STYLE_APPLIED = True
+
+
+def new_figure(figsize: Tuple[float, float], dpi: float, show: bool = False) -> Figure:
+    """
+    创建画布
+
+    参数：
+    figsize : 画布尺寸（英寸）
+    dpi : 分辨率
+    show : 是否需要交互显示（需要时经由pyplot创建）
+    """
+    apply_style()
+    if show:
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=figsize, dpi=dpi)
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def output_path(output_params: Dict[str, Any]) -> Optional[str]:
+    """
+    图片输出路径
+
+    参数：
+    output_params : 输出配置（save_path/filename/format，format默认png）
+    返回：输出路径（未配置save_path时为None）
+    """
+    if not output_params["save_path"]:
+        return None
+    image_format = output_params.get("format", "png")
+    return f"{output_params['save_path']}/{output_params['filename']}.{image_format}"
+
+
+def finish_figure(
+        fig: Figure,
+        output_params: Dict[str, Any],
+        show: bool = False) -> Optional[str]:
+    """
+    保存并按需显示图表
+
+    参数：
+    fig : 画布
+    output_params : 输出配置（save_path/filename/save_dpi/format，format默认png）
+    show : 是否交互显示（显示后关闭pyplot窗口）
+    返回：保存的图片路径（未保存时为None）
+    """
+    output_file = output_path(output_params)
+    if output_file:
+        fig.savefig(
+            output_file,
+            bbox_inches='tight',
+            dpi=output_params.get("save_dpi", 300)
+        )
+
+    if show:
+        import matplotlib.pyplot as plt
+        plt.show()
+        plt.close(fig)
+    return output_file
@@ -1,14 +1,14 @@
 # src/matplot/heatmap.py
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.figure import Figure
 from config.visualization_config import MATPLOT_HEATMAP_CONFIG
-from pylab import mpl
-
-mpl.rcParams["font.sans-serif"] = ["SimHei"]
-mpl.rcParams["axes.unicode_minus"] = False
+from src.aggregation import AggregationCube, calendar_matrix, hour_day_matrix
+from src.matplot import styles
+from src.matplot.canvas import new_figure, finish_figure, output_path
+from src.config_resolver import resolve_config
+from src.render_cache import lookup_render
 
 
 def create_heatmap(
@@ -18,7 +18,10 @@ def create_heatmap(
         value_col: str = "temperature",
         time_granularity: str = "hour",  # 时间粒度 hour/month/day
         show: bool = False,
-        **kwargs) -> None:
+        cube: Optional[AggregationCube] = None,
+        return_figure: bool = False,
+        use_cache: bool = False,
+        **kwargs) -> Union[Figure, str, None]:
     """
     创建气温热力图
 
@@ -29,11 +32,14 @@ def create_heatmap(
     value_col : 数值列名称（默认'temperature'）
     time_granularity : 时间维度（hour/day/month）
     show : 是否显示图表（默认False）
+    cube : 预聚合立方（可选，提供时直接复用其中的矩阵）
+    return_figure : 是否返回Figure对象而非图片路径（默认False）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染，直接返回已有图片路径）
     kwargs : 支持任意配置项的覆盖
+    返回：保存的图片路径（未保存时为None），return_figure为True时返回Figure
     """
     # 合并配置参数
-    final_config = {**MATPLOT_HEATMAP_CONFIG, **(config or {})}
-    final_config = _update_nested_dict(final_config, kwargs)
+    final_config = resolve_config("create_heatmap", MATPLOT_HEATMAP_CONFIG, config, kwargs)
 
     # 解包配置参数
     fig_params = final_config["figure"]
@@ -42,44 +48,42 @@ def create_heatmap(
     text_params = final_config["text"]
     output_params = final_config["output"]
 
-    # 数据预处理
-    df = df.copy()
-    df[time_col] = pd.to_datetime(df[time_col])
+    # 输出缓存
+    record = lookup_render(
+        "create_heatmap", final_config, cube if cube is not None else df, [output_path(output_params)],
+        enabled=use_cache and not (show or return_figure),
+        time_granularity=time_granularity, time_col=time_col, value_col=value_col
+    )
+    if record.fresh:
+        return record.output
 
     # 创建时间维度矩阵
     if time_granularity == "hour":
-        df["hour"] = df[time_col].dt.hour
-        df["day"] = df[time_col].dt.dayofyear
-        matrix = df.pivot_table(index="hour", columns="day", values=value_col)
-    elif time_granularity == "day":
-        df["day"] = df[time_col].dt.day
-        df["month"] = df[time_col].dt.month
-        matrix = df.pivot_table(index="day", columns="month", values=value_col)
-    elif time_granularity == "month":
-        df["month"] = df[time_col].dt.month
-        df["year"] = df[time_col].dt.year
-        matrix = df.pivot_table(index="month", columns="year", values=value_col)
+        if cube is not None:
+            matrix, _ = cube.hour_day_matrix()
+        else:
+            matrix, _ = hour_day_matrix(df, time_col, value_col)
+    elif time_granularity in ("day", "month"):
+        if cube is not None:
+            matrix = cube.calendar_matrix(time_granularity).to_numpy()
+        else:
+            matrix = calendar_matrix(df, time_col, value_col, time_granularity).to_numpy()
     else:
         raise ValueError("time_granularity参数必须是hour/day/month")
 
     # 创建画布
-    plt.figure(figsize=fig_params["figsize"], dpi=fig_params["dpi"])
-    ax = plt.gca()
-
-    # 创建自定义颜色映射
-    cmap = LinearSegmentedColormap.from_list(
-        "custom_cmap",
-        heatmap_params["cmap_colors"],
-        N=heatmap_params.get("cmap_levels", 256)
-    )
+    fig = new_figure(fig_params["figsize"], fig_params["dpi"], show)
+    ax = fig.add_subplot()
+
+    # 自定义颜色映射（进程内缓存）
+    cmap = styles.colormap(heatmap_params["cmap_colors"], heatmap_params.get("cmap_levels", 256))
 
     # 绘制热力图
     im = ax.imshow(
-        matrix.values,
+        matrix,
         aspect=heatmap_params.get("aspect_ratio"),
         cmap=cmap,
-        vmin=heatmap_params["vmin"],
-        vmax=heatmap_params["vmax"],
+        norm=styles.norm(heatmap_params["vmin"], heatmap_params["vmax"]),
         interpolation=heatmap_params.get("interpolation")
     )
 
@@ -87,7 +91,7 @@ def create_heatmap(
     _set_axis_labels(ax, matrix, time_granularity, axis_params, text_params)
 
     # 添加颜色条
-    cbar = plt.colorbar(im, fraction=0.023, pad=0.03)
+    cbar = fig.colorbar(im, ax=ax, fraction=0.023, pad=0.03)
     cbar.set_label(
         heatmap_params.get("cbar_label"),
         fontsize=text_params.get("label_fontsize")
@@ -101,18 +105,10 @@ def create_heatmap(
         pad=20
     )
 
-    # 保存输出
-    if output_params["save_path"]:
-        plt.savefig(
-            f"{output_params['save_path']}/{output_params['filename']}.png",
-            bbox_inches='tight',
-            dpi=output_params.get("save_dpi", 300)
-        )
-
-    # 显示控制
-    if show:
-        plt.show()
-    plt.close()
+    # 保存输出与显示控制
+    output_file = finish_figure(fig, output_params, show)
+    record.store()
+    return fig if return_figure else output_file
 
 
 def _set_axis_labels(ax, matrix, granularity, axis_params, text_params):
@@ -142,18 +138,9 @@ def _set_axis_labels(ax, matrix, granularity, axis_params, text_params):
         ax.set_yticklabels([f"{m + 1}月" for m in range(12)])
 
     # 标签旋转设置
-    plt.xticks(
-        rotation=axis_params["x_rotation"],
-        fontsize=text_params["tick_fontsize"]
+    ax.tick_params(
+        axis='x',
+        labelrotation=axis_params["x_rotation"],
+        labelsize=text_params["tick_fontsize"]
     )
-    plt.yticks(fontsize=text_params["tick_fontsize"])
-
-
-def _update_nested_dict(original: dict, updates: dict) -> dict:
-    """递归更新嵌套字典"""
-    for key, value in updates.items():
-        if isinstance(value, dict) and key in original:
-            original[key] = _update_nested_dict(original[key], value)
-        else:
-            original[key] = value
-    return original
+    ax.tick_params(axis='y', labelsize=text_params["tick_fontsize"])
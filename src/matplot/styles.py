@@ -0,0 +1,131 @@
+# src/matplot/styles.py
+"""
+样式资源缓存
+颜色映射、颜色标准化、字体解析结果与校验后的rcParams在进程内按参数缓存，批量渲染时各图表复用同一份对象；
+各缓存为有上限的LRU缓存（超出STYLE_CACHE_SIZE时淘汰最久未使用的项），clear_style_cache()可手动清空。
+缓存对象在多个图表间共享，调用方不应修改（如set_bad/set_clim）
+"""
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import matplotlib as mpl
+from matplotlib import font_manager
+from matplotlib.colors import Colormap, LinearSegmentedColormap, Normalize
+
+# 每类资源最多缓存的数量
+STYLE_CACHE_SIZE = 64
+
+
+def colormap(name_or_colors: Any, levels: int = 256) -> Colormap:
+    """
+    颜色映射
+
+    参数：
+    name_or_colors : 已注册的颜色映射名称，或颜色列表（按顺序线性插值）
+    levels : 颜色列表插值的级数
+    返回：颜色映射（查找表已初始化）
+    """
+    if isinstance(name_or_colors, str):
+        return _named_colormap(name_or_colors)
+    return _colormap_from_list(tuple(name_or_colors), int(levels))
+
+
+def norm(vmin: Optional[float], vmax: Optional[float]) -> Normalize:
+    """
+    颜色标准化
+
+    参数：
+    vmin/vmax : 色阶上下限（任一为None时由数据自动确定，此时不缓存）
+    """
+    if vmin is None or vmax is None:
+        return Normalize(vmin=vmin, vmax=vmax)
+    return _fixed_norm(float(vmin), float(vmax))
+
+
+def resolve_fonts(families: Sequence[str]) -> Tuple[str, ...]:
+    """
+    过滤出本机已安装的字体
+
+    参数：
+    families : 按优先级排列的字体名称（如["SimHei"]）
+    返回：已安装的字体名称，全部缺失时为空元组（由matplotlib默认字体兜底）
+    """
+    return _installed_fonts(tuple(families))
+
+
+def rc_params(params: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    校验后的rcParams（缺失的字体从font.*列表中移除，避免每段文字都重复查找回退字体）
+
+    参数：
+    params : rcParams设置（如MATPLOT_RC_PARAMS）
+    返回：可直接用于rcParams.update/rc_context的字典
+    """
+    return dict(_validated_rc_params(tuple(sorted((key, _hashable(value)) for key, value in params.items()))))
+
+
+def clear_style_cache() -> None:
+    """清空全部样式资源缓存（字体安装或颜色映射注册变化后调用）"""
+    for cached in (_named_colormap, _colormap_from_list, _fixed_norm, _installed_fonts, _validated_rc_params):
+        cached.cache_clear()
+
+
+def style_cache_info() -> Dict[str, Any]:
+    """各缓存的命中/未命中/当前数量"""
+    return {
+        name: cached.cache_info()._asdict()
+        for name, cached in (
+            ("colormap", _named_colormap),
+            ("colormap_from_list", _colormap_from_list),
+            ("norm", _fixed_norm),
+            ("fonts", _installed_fonts),
+            ("rc_params", _validated_rc_params)
+        )
+    }
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def _named_colormap(name: str) -> Colormap:
+    # 注册表每次取用都会复制一份，缓存后只复制一次
+    return _initialized(mpl.colormaps[name])
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def _colormap_from_list(colors: Tuple, levels: int) -> Colormap:
+    return _initialized(LinearSegmentedColormap.from_list("custom_cmap", colors, N=levels))
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def _fixed_norm(vmin: float, vmax: float) -> Normalize:
+    return Normalize(vmin=vmin, vmax=vmax)
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def _installed_fonts(families: Tuple[str, ...]) -> Tuple[str, ...]:
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    return tuple(family for family in families if family in installed)
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def _validated_rc_params(items: Tuple) -> Tuple:
+    params = dict(items)
+    for key, value in items:
+        if key.startswith("font.") and isinstance(value, tuple) and key != "font.family":
+            # 保留原列表中的通用字体族，缺失的具体字体交给默认字体兜底
+            params[key] = list(resolve_fonts(value)) + [
+                family for family in mpl.rcParamsDefault[key] if family not in value
+            ]
+    validated = mpl.RcParams(params)
+    return tuple(validated.items())
+
+
+def _initialized(cmap: Colormap) -> Colormap:
+    # 提前生成查找表，多线程首次使用时不再并发初始化
+    cmap(0.0)
+    return cmap
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(value)
+    return value
@@ -1,9 +1,14 @@
 # src/matplot/3d_surface.py
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from config.visualization_config import MATPLOT_3DSURFACE_CONFIG
+from src.aggregation import AggregationCube, hour_day_matrix
+from src.matplot import styles
+from src.matplot.canvas import new_figure, finish_figure, output_path
+from src.config_resolver import resolve_config
+from src.render_cache import lookup_render
 
 
 def create_3d_surface(
@@ -13,22 +18,28 @@ def create_3d_surface(
         value_col: str = "temperature",
         year: int = 2024,
         show: bool = False,
-        **kwargs) -> None:
+        cube: Optional[AggregationCube] = None,
+        return_figure: bool = False,
+        use_cache: bool = False,
+        **kwargs) -> Union[Figure, str, None]:
     """
     创建时间-小时-温度三维曲面图
 
     参数：
-    df : 包含时间序列数据的数据框
+    df : 包含时间序列数据的数据框（提供cube时可为None）
     config : 自定义配置字典
     date_col : 日期列名（默认'timestamp'）
     value_col : 温度列名（默认'temperature'）
     year : 要展示的年份（默认2024）
     show : 是否显示图表（默认False）
+    cube : 预聚合立方（可选，提供时直接复用其中的小时×日矩阵）
+    return_figure : 是否返回Figure对象而非图片路径（默认False）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染，直接返回已有图片路径）
     kwargs : 支持任意配置项的覆盖
+    返回：保存的图片路径（未保存时为None），return_figure为True时返回Figure
     """
     # 合并配置参数
-    final_config = {**MATPLOT_3DSURFACE_CONFIG, **(config or {})}
-    final_config = _update_nested_dict(final_config, kwargs)
+    final_config = resolve_config("create_3d_surface", MATPLOT_3DSURFACE_CONFIG, config, kwargs)
 
     # 解包配置参数
     fig_params = final_config["figure"]
@@ -37,23 +48,31 @@ def create_3d_surface(
     text_params = final_config["text"]
     output_params = final_config["output"]
 
-    # 数据预处理
-    df = _prepare_3d_data(df, date_col, year)
+    # 输出缓存
+    record = lookup_render(
+        "create_3d_surface", final_config, cube if cube is not None else df, [output_path(output_params)],
+        enabled=use_cache and not (show or return_figure),
+        year=year, date_col=date_col, value_col=value_col
+    )
+    if record.fresh:
+        return record.output
 
     # 创建网格数据
-    days = df['day_of_year'].unique()
-    hours = df['hour'].unique()
+    if cube is not None:
+        Z, days = cube.hour_day_matrix(year)
+    else:
+        Z, days = hour_day_matrix(df, date_col, value_col, year)
+    hours = np.arange(24)
     X, Y = np.meshgrid(days, hours)
-    Z = df.pivot(index='hour', columns='day_of_year', values=value_col).values
 
     # 创建画布
-    fig = plt.figure(figsize=fig_params["figsize"], dpi=fig_params["dpi"])
+    fig = new_figure(fig_params["figsize"], fig_params["dpi"], show)
     ax = fig.add_subplot(111, projection='3d')
 
     # 绘制曲面
     surf = ax.plot_surface(
         X, Y, Z,
-        cmap=surface_params["cmap"],
+        cmap=styles.colormap(surface_params["cmap"]),
         rstride=surface_params.get("rstride", 3),
         cstride=surface_params.get("cstride", 10),
         alpha=surface_params.get("alpha"),
@@ -65,7 +84,7 @@ def create_3d_surface(
     _set_3d_axes(ax, days, hours, Z, axis_params, text_params, year)
 
     # 添加颜色条
-    cbar = fig.colorbar(surf, shrink=0.5, aspect=10)
+    cbar = fig.colorbar(surf, ax=ax, shrink=0.5, aspect=10)
     cbar.set_label(
         surface_params.get("cbar_label"),
         fontsize=text_params.get("cbar_fontsize")
@@ -77,28 +96,10 @@ def create_3d_surface(
         azim=surface_params["azimuth"]
     )
 
-    # 保存输出
-    if output_params["save_path"]:
-        plt.savefig(
-            f"{output_params['save_path']}/{output_params['filename']}.png",
-            bbox_inches='tight',
-            dpi=output_params.get("save_dpi", 300)
-        )
-
-    # 显示控制
-    if show:
-        plt.show()
-    plt.close()
-
-
-def _prepare_3d_data(df, date_col, year):
-    """准备3D曲面数据"""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df[df[date_col].dt.year == year]
-    df['day_of_year'] = df[date_col].dt.dayofyear
-    df['hour'] = df[date_col].dt.hour
-    return df.sort_values(['day_of_year', 'hour'])
+    # 保存输出与显示控制
+    output_file = finish_figure(fig, output_params, show)
+    record.store()
+    return fig if return_figure else output_file
 
 
 def _set_3d_axes(ax, days, hours, Z, axis_params, text_params, year):
@@ -146,13 +147,3 @@ def _set_3d_axes(ax, days, hours, Z, axis_params, text_params, year):
         fontsize=text_params["title_fontsize"],
         y=text_params["title_ypos"]
     )
-
-
-def _update_nested_dict(original: dict, updates: dict) -> dict:
-    """递归更新嵌套字典"""
-    for key, value in updates.items():
-        if isinstance(value, dict) and key in original:
-            original[key] = _update_nested_dict(original[key], value)
-        else:
-            original[key] = value
-    return original
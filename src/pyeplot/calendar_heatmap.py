@@ -1,10 +1,16 @@
 # src/pyeplot/calendar_heatmap.py
-from typing import AnyStr
+from typing import AnyStr, Optional
 
 from pyecharts import options as opts
 from pyecharts.charts import Calendar
+import numpy as np
 import pandas as pd
 from config.visualization_config import PYE_CALENDAR_CONFIG
+from src.aggregation import DAILY_AGGREGATES, AggregationCube, daily_aggregate, daily_table
+from src.time_index import as_time_index
+from src.config_resolver import resolve_config
+from src.pyeplot.payload import RAW_JSON_THRESHOLD, attach_data, render_chart, series_data, uses_series
+from src.render_cache import lookup_render
 
 
 def create_pye_calendar(
@@ -13,30 +19,44 @@ def create_pye_calendar(
         date_col: str = "timestamp",
         value_col: str = "temperature",
         year: int = 2024,
-        **kwargs) -> Calendar:
+        cube: AggregationCube = None,
+        use_cache: bool = False,
+        **kwargs) -> Optional[Calendar]:
     """
     创建交互式日历热力图
 
     参数：
-    df : 包含日期和温度的数据框
+    df : 包含日期和温度的数据框（或src.time_index.TimeIndex，按年二分切片；提供cube时可为None）
     config : 自定义配置字典
     date_col : 日期列名（默认'timestamp'）
     value_col : 温度列名（默认'temperature'）
     year : 要展示的年份（默认2024）
+    cube : 预聚合立方（可选，提供时直接复用其中的逐日统计表）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染并返回None）
     kwargs : 支持配置项覆盖
     """
     # 合并配置参数
-    final_config = {**PYE_CALENDAR_CONFIG, **(config or {})}
-    final_config.update(kwargs)
+    final_config = resolve_config("create_pye_calendar", PYE_CALENDAR_CONFIG, config, kwargs)
 
-    # 准备数据
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df[df[date_col].dt.year == year]
-    data = [
-        [d.strftime("%Y-%m-%d"), v]
-        for d, v in zip(df[date_col], df[value_col])
-    ]
+    # 输出缓存
+    output_file = None
+    if final_config["output_path"]:
+        output_file = f"{final_config['output_path']}/{final_config['filename']}.html"
+    record = lookup_render(
+        "create_pye_calendar", final_config, cube if cube is not None else df, [output_file],
+        enabled=use_cache,
+        date_col=date_col, value_col=value_col, year=year
+    )
+    if record.fresh:
+        return None
+
+    # 准备数据（每天一个值，日期字符串整列格式化）
+    dates, values = _daily_values(df, cube, date_col, value_col, year, final_config.get("aggregate", "mean"))
+    data = series_data(
+        [dates, values],
+        decimals=final_config.get("value_decimals"),
+        raw_threshold=final_config.get("raw_json_threshold", RAW_JSON_THRESHOLD)
+    ) if uses_series(final_config) else []
 
     # 创建日历图
     calendar = Calendar(init_opts=opts.InitOpts(
@@ -64,6 +84,11 @@ def create_pye_calendar(
         )
     )
 
+    # dataset/sidecar模式下改为列式数据
+    sidecars = attach_data(
+        calendar, {"date": dates, "value": values}, {"time": "date", "value": "value"}, final_config, output_file
+    )
+
     calendar.set_global_opts(
         title_opts=opts.TitleOpts(
             title=final_config["title"],
@@ -89,7 +114,27 @@ def create_pye_calendar(
     )
 
     # 保存输出
-    if final_config["output_path"]:
-        calendar.render(f"{final_config['output_path']}/{final_config['filename']}.html")
+    if output_file:
+        render_chart(calendar, output_file, sidecars)
+        record.outputs.extend(sidecars)
+        record.store()
 
     return calendar
+
+
+def _daily_values(df, cube, date_col, value_col, year, aggregate):
+    """指定年份有数据的日期（YYYY-MM-DD）与按aggregate聚合的逐日取值"""
+    if aggregate not in DAILY_AGGREGATES:
+        raise ValueError(f"aggregate参数必须是{'/'.join(DAILY_AGGREGATES)}")
+    if cube is not None:
+        table = cube.daily[cube.daily.index.year == year]
+    else:
+        index = as_time_index(df, date_col, (value_col,)).year(year)
+        table = daily_table(index, value_col) if len(index) else None
+    if table is None or not len(table):
+        raise ValueError(f"数据中不包含{year}年")
+
+    table = table[table["count"] > 0]
+    values = daily_aggregate(table, aggregate)
+    dates = np.datetime_as_string(table.index.to_numpy(dtype="datetime64[D]"), unit="D")
+    return dates, values
@@ -1,10 +1,15 @@
 # src/pyeplot/heatmap.py
-from typing import AnyStr
+from typing import AnyStr, Optional
 
 from pyecharts import options as opts
 from pyecharts.charts import HeatMap
+import numpy as np
 import pandas as pd
 from config.visualization_config import PYE_HEATMAP_CONFIG
+from src.aggregation import AggregationCube, calendar_matrix, hour_day_matrix
+from src.config_resolver import resolve_config
+from src.pyeplot.payload import RAW_JSON_THRESHOLD, attach_data, matrix_cells, render_chart, series_data, uses_series
+from src.render_cache import lookup_render
 
 
 def create_pye_heatmap(
@@ -13,50 +18,63 @@ def create_pye_heatmap(
         time_col: str = "timestamp",
         value_col: str = "temperature",
         time_granularity: str = "hour",
-        **kwargs) -> HeatMap:
+        cube: AggregationCube = None,
+        use_cache: bool = False,
+        **kwargs) -> Optional[HeatMap]:
     """
     创建交互式气温热力图
 
     参数：
-    df : 包含时间序列数据的数据框
+    df : 包含时间序列数据的数据框（提供cube时可为None）
     config : 自定义配置字典（可选）
     time_col : 时间列名称（默认'timestamp'）
     value_col : 数值列名称（默认'temperature'）
     time_granularity : 时间维度（hour/day/month）
+    cube : 预聚合立方（可选，提供时直接复用其中的矩阵）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染并返回None）
     kwargs : 支持配置项覆盖
     """
     # 合并配置参数
-    final_config = {**PYE_HEATMAP_CONFIG, **(config or {})}
-    final_config.update(kwargs)
+    final_config = resolve_config("create_pye_heatmap", PYE_HEATMAP_CONFIG, config, kwargs)
 
-    # 数据预处理
-    df = df.copy()
-    df[time_col] = pd.to_datetime(df[time_col])
+    # 输出缓存
+    output_file = None
+    if final_config["output_path"]:
+        output_file = f"{final_config['output_path']}/{final_config['filename']}.html"
+    record = lookup_render(
+        "create_pye_heatmap", final_config, cube if cube is not None else df, [output_file],
+        enabled=use_cache,
+        time_col=time_col, value_col=value_col, time_granularity=time_granularity
+    )
+    if record.fresh:
+        return None
 
-    # 生成坐标数据
+    # 生成坐标矩阵（行为Y轴，列为X轴，单元格为均值）
     if time_granularity == "hour":
-        df["x_axis"] = df[time_col].dt.dayofyear
-        df["y_axis"] = df[time_col].dt.hour
+        if cube is not None:
+            values, x_axis = cube.hour_day_matrix()
+        else:
+            values, x_axis = hour_day_matrix(df, time_col, value_col)
+        y_axis = np.arange(24)
         x_label = "Day of Year"
         y_label = "Hour"
-    elif time_granularity == "day":
-        df["x_axis"] = df[time_col].dt.month
-        df["y_axis"] = df[time_col].dt.day
-        x_label = "Month"
-        y_label = "Day"
-    elif time_granularity == "month":
-        df["x_axis"] = df[time_col].dt.year
-        df["y_axis"] = df[time_col].dt.month
-        x_label = "Year"
-        y_label = "Month"
+    elif time_granularity in ("day", "month"):
+        if cube is not None:
+            matrix = cube.calendar_matrix(time_granularity)
+        else:
+            matrix = calendar_matrix(df, time_col, value_col, time_granularity)
+        values, x_axis, y_axis = matrix.to_numpy(dtype=float), matrix.columns.to_numpy(), matrix.index.to_numpy()
+        x_label, y_label = ("Month", "Day") if time_granularity == "day" else ("Year", "Month")
     else:
         raise ValueError("time_granularity参数必须是hour/day/month")
 
-    # 生成热力数据
-    data = [
-        [int(row["x_axis"]), int(row["y_axis"]), float(row[value_col])]
-        for _, row in df.iterrows()
-    ]
+    # 生成热力数据（类目轴上的坐标为类目序号）
+    cells = matrix_cells(values)
+    data = series_data(
+        cells,
+        decimals=final_config.get("value_decimals"),
+        raw_threshold=final_config.get("raw_json_threshold", RAW_JSON_THRESHOLD)
+    ) if uses_series(final_config) else []
 
     # 创建热力图
     heatmap = HeatMap(init_opts=opts.InitOpts(
@@ -66,10 +84,10 @@ def create_pye_heatmap(
     ))
 
     heatmap.add_xaxis(
-        xaxis_data=sorted(df["x_axis"].unique().astype(int)))
+        xaxis_data=np.asarray(x_axis).astype(int).tolist())
     heatmap.add_yaxis(
         series_name=final_config["series_name"],
-        yaxis_data=sorted(df["y_axis"].unique().astype(int)),
+        yaxis_data=np.asarray(y_axis).astype(int).tolist(),
         value=data,
         label_opts=opts.LabelOpts(
             is_show=final_config["show_label"],
@@ -77,6 +95,12 @@ def create_pye_heatmap(
         )
     )
 
+    # dataset/sidecar模式下改为列式数据
+    sidecars = attach_data(
+        heatmap, dict(zip(("x", "y", "value"), cells)), {"x": "x", "y": "y", "value": "value"},
+        final_config, output_file
+    )
+
     # 设置全局配置
     heatmap.set_global_opts(
         title_opts=opts.TitleOpts(
@@ -128,7 +152,9 @@ def create_pye_heatmap(
     )
 
     # 保存输出
-    if final_config["output_path"]:
-        heatmap.render(f"{final_config['output_path']}/{final_config['filename']}.html")
+    if output_file:
+        render_chart(heatmap, output_file, sidecars)
+        record.outputs.extend(sidecars)
+        record.store()
 
     return heatmap
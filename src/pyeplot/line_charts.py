@@ -1,9 +1,14 @@
 # src/pyeplot/line_chart.py
+from typing import Optional
 from pyecharts import options as opts
 from pyecharts.charts import Line
 from pyecharts.commons.utils import JsCode
+import numpy as np
 import pandas as pd
 from config.visualization_config import PYE_LINE_CONFIG
+from src.config_resolver import resolve_config
+from src.pyeplot.payload import RAW_JSON_THRESHOLD, attach_data, render_chart, series_data, uses_series
+from src.render_cache import lookup_render
 
 
 def create_pye_line(
@@ -11,7 +16,8 @@ def create_pye_line(
         config: dict = None,
         time_col: str = "timestamp",
         value_col: str = "temperature",
-        **kwargs) -> Line:
+        use_cache: bool = False,
+        **kwargs) -> Optional[Line]:
     """
     创建交互式温度折线图
 
@@ -20,15 +26,30 @@ def create_pye_line(
     config : 自定义配置字典（可选）
     time_col : 时间列名（默认'timestamp'）
     value_col : 数值列名（默认'temperature'）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染并返回None）
     kwargs : 支持配置项覆盖
     """
     # 合并配置参数
-    final_config = {**PYE_LINE_CONFIG, **(config or {})}
-    final_config.update(kwargs)
+    final_config = resolve_config("create_pye_line", PYE_LINE_CONFIG, config, kwargs)
 
-    # 处理数据
-    dates = df[time_col].dt.strftime(final_config["date_format"]).tolist()
-    values = df[value_col].round(2).tolist()
+    # 输出缓存
+    output_file = None
+    if final_config["output_path"]:
+        output_file = f"{final_config['output_path']}/{final_config['filename']}.html"
+    record = lookup_render(
+        "create_pye_line", final_config, df, [output_file],
+        enabled=use_cache,
+        time_col=time_col, value_col=value_col
+    )
+    if record.fresh:
+        return None
+
+    # 大数据模式：时间轴+数值时间戳、降采样与渐进渲染，超过点数预算时不显示标记点与平滑
+    n_points = len(df)
+    large = _large_mode(final_config, n_points)
+    show_symbol = n_points <= final_config.get("symbol_budget", n_points)
+    # 大数据模式与dataset/sidecar模式使用时间轴（数据在添加系列后整列写入）
+    time_axis = large or not uses_series(final_config)
 
     # 初始化图表
     line_chart = Line(init_opts=opts.InitOpts(
@@ -38,11 +59,18 @@ def create_pye_line(
     ))
 
     # 添加数据
-    line_chart.add_xaxis(xaxis_data=dates)
+    if time_axis:
+        line_chart.add_xaxis(xaxis_data=[])
+        values = []
+    else:
+        line_chart.add_xaxis(xaxis_data=df[time_col].dt.strftime(final_config["date_format"]).tolist())
+        values = np.round(df[value_col].to_numpy(dtype=float), 2).tolist()
     line_chart.add_yaxis(
         series_name=final_config["series_name"],
         y_axis=values,
-        is_smooth=final_config["is_smooth"],
+        is_smooth=final_config["is_smooth"] and not large,
+        is_symbol_show=show_symbol,
+        sampling=final_config.get("sampling") if large else None,
         symbol=final_config["symbol"],
         symbol_size=final_config["symbol_size"],
         color=final_config["line_color"],
@@ -57,6 +85,27 @@ def create_pye_line(
         )
     )
 
+    sidecars = []
+    if time_axis:
+        # [毫秒时间戳, 数值]按块生成文本（直接引用数据框的列，不做整列转换）；时间戳按UTC显示，与数据中的本地时刻一致
+        times = df[time_col].to_numpy(dtype="datetime64[ns]")
+        temps = df[value_col].to_numpy()
+        series = line_chart.options["series"][-1]
+        series["data"] = series_data(
+            [times, temps],
+            decimals=final_config.get("value_decimals", 2),
+            raw_threshold=final_config.get("raw_json_threshold", RAW_JSON_THRESHOLD)
+        ) if uses_series(final_config) else []
+        if large:
+            series["progressive"] = final_config.get("progressive")
+            series["progressiveThreshold"] = final_config.get("progressive_threshold")
+        line_chart.options["useUTC"] = True
+
+        # dataset/sidecar模式下改为列式数据
+        sidecars = attach_data(
+            line_chart, {"time": times, "value": temps}, {"x": "time", "y": "value"}, final_config, output_file
+        )
+
     # 设置全局配置
     line_chart.set_global_opts(
         title_opts=opts.TitleOpts(
@@ -75,7 +124,7 @@ def create_pye_line(
             border_color="#ccc"
         ),
         xaxis_opts=opts.AxisOpts(
-            type_="category",
+            type_="time" if time_axis else "category",
             name=final_config["xaxis_name"],
             axislabel_opts=opts.LabelOpts(
                 rotate=final_config["xaxis_rotate"],
@@ -104,8 +153,21 @@ def create_pye_line(
         )
     )
 
+    if time_axis:
+        line_chart.options["xAxis"][0].pop("data", None)
+
     # 保存输出
-    if final_config["output_path"]:
-        line_chart.render(f"{final_config['output_path']}/{final_config['filename']}.html")
+    if output_file:
+        render_chart(line_chart, output_file, sidecars)
+        record.outputs.extend(sidecars)
+        record.store()
+
+    return line_chart
+
 
-    return line_chart
\ No newline at end of file
+def _large_mode(final_config, n_points: int) -> bool:
+    """是否启用大数据模式（large_mode为"auto"时按large_threshold判断）"""
+    mode = final_config.get("large_mode", "auto")
+    if mode == "auto":
+        return n_points > final_config.get("large_threshold", 20000)
+    return bool(mode)
@@ -0,0 +1,385 @@
+# src/pyeplot/payload.py
+"""
+ECharts数据载荷
+由数值数组整列生成系列数据，不逐行构造Python对象；
+数据点超过阈值时直接生成JSON数组文本，经JsCode原样写入图表option（不经过嵌套列表与json.dumps）。
+
+data_encoding配置决定数据写在哪里：
+    series  : 系列的data中（默认）
+    dataset : 列式的ECharts dataset（{'列名': [...]}，固定小数位），系列通过encode引用
+    sidecar : 与dataset相同，但数据写入输出目录下按内容哈希命名的脚本文件，
+              数据相同的图表共用一个文件（以脚本而非JSON/二进制文件引用，页面以file://打开时同样可以加载）
+数据文本按TEXT_BLOCK_ROWS行分块生成，sidecar逐块写入文件，不在内存中拼出完整文本；
+数据变化后旧的sidecar不再被任何页面引用，由prune_sidecars清理
+"""
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from jinja2 import ChoiceLoader, DictLoader, Environment
+from pyecharts.commons.utils import JsCode
+from pyecharts.globals import CurrentConfig
+
+# 默认的原样写入阈值（数据点数）
+RAW_JSON_THRESHOLD = 20000
+
+# 分块生成数据文本的行数
+TEXT_BLOCK_ROWS = 1 << 16
+
+# 可选的数据写入方式
+DATA_ENCODINGS = ("series", "dataset", "sidecar")
+
+# sidecar脚本把数据登记到该全局对象中（键为内容哈希）
+SIDECAR_GLOBAL = "PYE_DATA"
+
+# 在pyecharts的simple_chart.html基础上，于图表脚本之前引用sidecar脚本
+_SIDECAR_TEMPLATE = """{% import 'macro' as macro %}
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{{ chart.page_title }}</title>
+    {{ macro.render_chart_dependencies(chart) }}
+    {{ macro.render_chart_css(chart) }}
+    {% for src in sidecars %}
+    <script type="text/javascript" src="{{ src }}"></script>
+    {% endfor %}
+</head>
+<body {% if chart.fill_bg %}style="background-color: {{ chart.bg_color }}"{% endif %}>
+    {{ macro.render_chart_content(chart) }}
+</body>
+</html>
+"""
+
+# 页面中引用sidecar的script标签
+_SIDECAR_SRC = re.compile(r'<script[^>]*\ssrc="([^"]+\.js)"')
+# write_sidecar写出的文件名（内容哈希）
+_SIDECAR_NAME = re.compile(r"[0-9a-f]{32}\.js")
+
+_ENV_LOCK = threading.Lock()
+_SIDECAR_ENV = None
+
+
+def matrix_cells(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    矩阵中非空单元格的整数坐标
+
+    参数：
+    values : 行为Y轴、列为X轴的二维数组（NaN表示无数据）
+    返回：(列序号, 行序号, 值)，按行优先顺序排列
+    """
+    values = np.asarray(values, dtype=float)
+    rows, cols = np.nonzero(~np.isnan(values))
+    return cols, rows, values[rows, cols]
+
+
+def grid_cells(values: np.ndarray, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    规则网格的全部单元格坐标（曲面等需要完整网格的系列，NaN保留）
+
+    参数：
+    values : 行为Y轴、列为X轴的二维数组
+    x : 各列的X坐标
+    y : 各行的Y坐标
+    返回：(X坐标, Y坐标, 值)，按行优先顺序排列
+    """
+    values = np.asarray(values, dtype=float)
+    return np.tile(np.asarray(x), len(y)), np.repeat(np.asarray(y), len(x)), values.ravel()
+
+
+def decimate(
+        values: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        x_step: int = 1,
+        y_step: int = 1,
+        max_points: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按块平均降低网格精度（每块取非空值的均值，坐标取块内第一个）
+
+    参数：
+    values : 行为Y轴、列为X轴的二维数组
+    x : 各列的X坐标
+    y : 各行的Y坐标
+    x_step/y_step : 每块合并的列数/行数
+    max_points : 单元格数上限（超出时继续增大x_step）
+    返回：(降采样后的矩阵, X坐标, Y坐标)
+    """
+    values = np.asarray(values, dtype=float)
+    x_step, y_step = max(int(x_step), 1), max(int(y_step), 1)
+    if max_points:
+        rows = -(-values.shape[0] // y_step)
+        x_step = max(x_step, -(-rows * values.shape[1] // max_points))
+    if x_step == 1 and y_step == 1:
+        return values, np.asarray(x), np.asarray(y)
+    filled = np.isfinite(values)
+    sums, counts = np.where(filled, values, 0.0), filled.astype(float)
+    x_starts = np.arange(0, values.shape[1], x_step)
+    y_starts = np.arange(0, values.shape[0], y_step)
+    for axis, starts in ((1, x_starts), (0, y_starts)):
+        sums = np.add.reduceat(sums, starts, axis=axis)
+        counts = np.add.reduceat(counts, starts, axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return means, np.asarray(x)[x_starts], np.asarray(y)[y_starts]
+
+
+def series_data(
+        columns: Sequence[np.ndarray],
+        decimals: Optional[int] = None,
+        raw_threshold: int = RAW_JSON_THRESHOLD) -> Union[list, JsCode]:
+    """
+    由等长的列数组生成系列数据（每个数据点为[列0, 列1, ...]）
+
+    参数：
+    columns : 各列数组（整数列原样输出，浮点列可按decimals舍入，NaN输出为null，字符串列输出为单引号字符串，
+              datetime64列输出为毫秒时间戳）
+    decimals : 浮点列保留的小数位数（默认不舍入）
+    raw_threshold : 数据点超过该数量时返回原样写入option的JSON文本
+    返回：嵌套列表或JsCode
+    """
+    columns = [np.asarray(column) for column in columns]
+    if len(columns[0]) <= raw_threshold:
+        return [list(row) for row in zip(*(_to_list(_round(column, decimals)) for column in columns))]
+    return JsCode(json_rows(columns, decimals))
+
+
+def json_rows(columns: Sequence[np.ndarray], decimals: Optional[int] = None) -> str:
+    """
+    把等长的列数组整列格式化为JSON二维数组文本
+
+    参数：
+    columns : 各列数组
+    decimals : 浮点列保留的小数位数（默认不舍入）
+    返回：形如[[x,y,v],...]的文本
+    """
+    return "".join(_json_row_parts(columns, decimals))
+
+
+def _json_row_parts(columns: Sequence[np.ndarray], decimals: Optional[int]) -> Iterator[str]:
+    columns = [np.asarray(column) for column in columns]
+    if len(columns[0]) == 0:
+        yield "[]"
+        return
+    for start in range(0, len(columns[0]), TEXT_BLOCK_ROWS):
+        block = [_round(column[start:start + TEXT_BLOCK_ROWS], decimals) for column in columns]
+        text = _column_text(block[0])
+        for column in block[1:]:
+            text = np.char.add(np.char.add(text, ","), _column_text(column))
+        yield ("[[" if start == 0 else ",[") + "],[".join(text.tolist()) + "]"
+    yield "]"
+
+
+def _round(column: np.ndarray, decimals: Optional[int]) -> np.ndarray:
+    if decimals is not None and column.dtype.kind == "f":
+        # 先转为float64再舍入，float32舍入后的值转为Python浮点数时会带出尾数
+        return np.round(column.astype(np.float64, copy=False), decimals)
+    return column
+
+
+def _to_list(column: np.ndarray) -> list:
+    if column.dtype.kind == "M":
+        return column.astype("datetime64[ms]").astype(np.int64).tolist()
+    if column.dtype.kind == "f" and np.isnan(column).any():
+        return [None if value != value else value for value in column.tolist()]
+    return column.tolist()
+
+
+def _column_text(column: np.ndarray) -> np.ndarray:
+    if column.dtype.kind == "M":
+        return column.astype("datetime64[ms]").astype(np.int64).astype(str)
+    if column.dtype.kind in "iu":
+        return column.astype(np.int64).astype(str)
+    if column.dtype.kind in "USO":
+        # 字符串列（如日期）使用单引号：JSON序列化时双引号会被转义，而option按JavaScript对象字面量嵌入页面
+        return np.char.add(np.char.add("'", column.astype(str)), "'")
+    text = column.astype(str)
+    missing = np.isnan(column)
+    if missing.any():
+        text = np.where(missing, "null", text)
+    return text
+
+
+def columnar_source(columns: Mapping[str, np.ndarray], decimals: Optional[int] = None) -> str:
+    """
+    列式dataset.source文本
+
+    参数：
+    columns : 列名到数组的映射（浮点列按decimals舍入，NaN输出为null）
+    decimals : 浮点列保留的小数位数（默认不舍入）
+    返回：形如{'x':[...],'value':[...]}的文本（JavaScript对象字面量，键与字符串使用单引号）
+    """
+    return "".join(_columnar_parts(columns, decimals))
+
+
+def _columnar_parts(columns: Mapping[str, np.ndarray], decimals: Optional[int]) -> Iterator[str]:
+    yield "{"
+    for i, (name, column) in enumerate(columns.items()):
+        column = np.asarray(column)
+        yield f"{',' if i else ''}'{name}':["
+        for start in range(0, len(column), TEXT_BLOCK_ROWS):
+            block = _column_text(_round(column[start:start + TEXT_BLOCK_ROWS], decimals))
+            yield ("," if start else "") + ",".join(block.tolist())
+        yield "]"
+    yield "}"
+
+
+def uses_series(final_config: Mapping) -> bool:
+    """数据是否写在系列的data中（data_encoding为series）"""
+    return final_config.get("data_encoding", "series") == "series"
+
+
+def attach_data(
+        chart,
+        columns: Dict[str, np.ndarray],
+        encode: Optional[Dict[str, str]],
+        final_config: Mapping,
+        output_file: Optional[str]) -> List[str]:
+    """
+    按final_config["data_encoding"]改写图表最后一个系列的数据
+
+    参数：
+    chart : pyecharts图表（系列已添加）
+    columns : 系列数据的各列
+    encode : 系列各维度对应的列名；为None时系列不支持dataset（如3D曲面），数据按行数组写入系列
+    final_config : 图表配置（data_encoding/value_decimals/sidecar_dir）
+    output_file : 输出的html文件（sidecar写在其所在目录下；为None时按dataset内联）
+    返回：生成的sidecar文件路径（series/dataset模式为空列表）
+    """
+    mode = final_config.get("data_encoding", "series")
+    if mode not in DATA_ENCODINGS:
+        raise ValueError(f"data_encoding参数必须是{'/'.join(DATA_ENCODINGS)}")
+    if mode == "series":
+        return []
+
+    decimals = final_config.get("value_decimals")
+    if encode is None:
+        parts = _json_row_parts(list(columns.values()), decimals)
+    else:
+        parts = _columnar_parts(columns, decimals)
+
+    sidecars = []
+    if mode == "sidecar" and output_file:
+        # 逐块写入文件，完整的数据文本不进入内存
+        path, key = write_sidecar(parts, os.path.join(os.path.dirname(output_file), final_config.get("sidecar_dir", "data")))
+        text = f"{SIDECAR_GLOBAL}['{key}']"
+        sidecars.append(path)
+    else:
+        text = "".join(parts)
+
+    series = chart.options["series"][-1]
+    if encode is None:
+        series["data"] = JsCode(text)
+    else:
+        chart.options["dataset"] = {"source": JsCode(text)}
+        series["data"] = None
+        series["datasetIndex"] = 0
+        series["encode"] = encode
+    return sidecars
+
+
+def write_sidecar(text: Union[str, Iterable[str]], directory: str) -> Tuple[str, str]:
+    """
+    写出sidecar脚本（边写边计算内容哈希，内容相同的文件已存在时直接复用）
+    数据在前、键在后（作为函数参数传入），因此无需先得到完整文本即可写出
+
+    参数：
+    text : 数据文本（dataset.source或行数组），或依次产出文本片段的可迭代对象
+    directory : 存放目录
+    返回：(文件路径, 内容哈希)
+    """
+    parts = [text] if isinstance(text, str) else text
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.blake2b(digest_size=16)
+    tmp_path = os.path.join(directory, f".sidecar.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"(function (data, key) {{ (window.{SIDECAR_GLOBAL} = window.{SIDECAR_GLOBAL} || {{}})[key] = data; }})(")
+            for part in parts:
+                digest.update(part.encode("utf-8"))
+                f.write(part)
+            key = digest.hexdigest()
+            f.write(f", '{key}');\n")
+        path = os.path.join(directory, f"{key}.js")
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, key
+
+
+def prune_sidecars(
+        output_dirs: Iterable[str],
+        sidecar_dirs: Iterable[str],
+        before: Optional[float] = None) -> List[str]:
+    """
+    删除不再被任何html页面引用的sidecar文件（只删除write_sidecar写出的按内容哈希命名的文件）
+
+    参数：
+    output_dirs : html所在目录（页面可能引用sidecar的全部目录）
+    sidecar_dirs : sidecar目录（各图表按output_path与sidecar_dir解析出的目录）
+    before : 只删除修改时间早于该时间戳的文件（传入批量渲染的开始时间，避免删除并发渲染中刚写出、页面尚未写出的文件）
+    返回：已删除的文件路径
+    """
+    referenced = set()
+    for output_dir in set(output_dirs):
+        if not os.path.isdir(output_dir):
+            continue
+        for name in os.listdir(output_dir):
+            if name.endswith(".html"):
+                with open(os.path.join(output_dir, name), encoding="utf-8", errors="ignore") as f:
+                    referenced.update(
+                        os.path.abspath(os.path.join(output_dir, src)) for src in _SIDECAR_SRC.findall(f.read())
+                    )
+
+    removed = []
+    for directory in {os.path.abspath(directory) for directory in sidecar_dirs}:
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if not _SIDECAR_NAME.fullmatch(name) or path in referenced:
+                continue
+            if before is not None and os.path.getmtime(path) >= before:
+                continue
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def render_chart(chart, output_file: str, sidecars: Sequence[str] = ()) -> str:
+    """
+    渲染html；有sidecar时在页面中按相对路径引用
+
+    参数：
+    chart : pyecharts图表
+    output_file : 输出的html文件
+    sidecars : attach_data返回的sidecar文件路径
+    返回：输出文件路径
+    """
+    if not sidecars:
+        return chart.render(output_file)
+    base = os.path.dirname(os.path.abspath(output_file))
+    sources = [os.path.relpath(os.path.abspath(path), base).replace(os.sep, "/") for path in sidecars]
+    return chart.render(output_file, template_name="sidecar_chart.html", env=_sidecar_env(), sidecars=sources)
+
+
+def _sidecar_env() -> Environment:
+    global _SIDECAR_ENV
+    with _ENV_LOCK:
+        if _SIDECAR_ENV is None:
+            base = CurrentConfig.GLOBAL_ENV
+            _SIDECAR_ENV = Environment(
+                keep_trailing_newline=base.keep_trailing_newline,
+                trim_blocks=base.trim_blocks,
+                lstrip_blocks=base.lstrip_blocks,
+                loader=ChoiceLoader([DictLoader({"sidecar_chart.html": _SIDECAR_TEMPLATE}), base.loader])
+            )
+        return _SIDECAR_ENV
@@ -1,11 +1,15 @@
 # src/pyeplot/3d_surface.py
-from typing import AnyStr
+from typing import AnyStr, Optional, Sequence, Union
 
 from pyecharts import options as opts
 from pyecharts.charts import Surface3D
 import pandas as pd
 import numpy as np
 from config.visualization_config import PYE_3DSURFACE_CONFIG
+from src.aggregation import AggregationCube, hour_day_matrix, hour_span_matrix
+from src.config_resolver import resolve_config
+from src.pyeplot.payload import RAW_JSON_THRESHOLD, attach_data, decimate, grid_cells, render_chart, series_data, uses_series
+from src.render_cache import lookup_render
 
 
 def create_pye_3dsurface(
@@ -13,37 +17,61 @@ def create_pye_3dsurface(
         config: dict[str, AnyStr] = None,
         date_col: str = "timestamp",
         value_col: str = "temperature",
-        year: int = 2024,
-        **kwargs) -> Surface3D:
+        year: Union[int, Sequence[int], None] = 2024,
+        cube: AggregationCube = None,
+        use_cache: bool = False,
+        **kwargs) -> Optional[Surface3D]:
     """
     创建交互式3D曲面图
 
     参数：
-    df : 包含时间序列数据的数据框
+    df : 包含时间序列数据的数据框（提供cube时可为None）
     config : 自定义配置字典
     date_col : 日期列名（默认'timestamp'）
     value_col : 温度列名（默认'temperature'）
-    year : 要展示的年份（默认2024）
+    year : 要展示的年份（默认2024）；None表示所有年份按年内第几天合并；
+           年份列表表示按顺序首尾相接为一个跨年曲面（X轴为自首个年份1月1日起的第几天，网格点超过max_points时自动合并天数）
+    cube : 预聚合立方（可选，提供时直接复用其中的小时×日矩阵）
+    use_cache : 是否启用输出缓存（默认False；输入数据、配置与代码都未变化时跳过渲染并返回None）
     kwargs : 支持配置项覆盖
     """
     # 合并配置参数
-    final_config = {**PYE_3DSURFACE_CONFIG, **(config or {})}
-    final_config.update(kwargs)
+    final_config = resolve_config("create_pye_3dsurface", PYE_3DSURFACE_CONFIG, config, kwargs)
 
-    # 数据预处理
-    df = _prepare_pye3d_data(df, date_col, year)
+    # 输出缓存
+    output_file = None
+    if final_config["output_path"]:
+        output_file = f"{final_config['output_path']}/{final_config['filename']}.html"
+    record = lookup_render(
+        "create_pye_3dsurface", final_config, cube if cube is not None else df, [output_file],
+        enabled=use_cache,
+        date_col=date_col, value_col=value_col, year=year
+    )
+    if record.fresh:
+        return None
 
-    # 生成网格数据
-    days = df['day_of_year'].unique()
-    hours = df['hour'].unique()
-    X, Y = np.meshgrid(days, hours)
-    Z = df.pivot(index='hour', columns='day_of_year', values=value_col).values
+    # 生成网格数据（跨年曲面的X轴延伸到最后一年年末）
+    years = None if year is None or np.isscalar(year) else [int(y) for y in year]
+    if years is None:
+        Z, days = cube.hour_day_matrix(year) if cube is not None else hour_day_matrix(df, date_col, value_col, year)
+        x_max = 366
+    else:
+        Z, days = cube.hour_span_matrix(years) if cube is not None else hour_span_matrix(df, date_col, value_col, years)
+        x_max = sum(366 if pd.Timestamp(year=y, month=1, day=1).is_leap_year else 365 for y in years)
+    Z, days, hours = decimate(
+        Z, days, np.arange(24),
+        x_step=final_config.get("day_step", 1),
+        y_step=final_config.get("hour_step", 1),
+        max_points=final_config.get("max_points")
+    )
 
-    # 转换为Pyecharts数据格式
-    data = []
-    for i in range(X.shape[0]):
-        for j in range(X.shape[1]):
-            data.append([int(X[i, j]), int(Y[i, j]), round(float(Z[i, j]), 1)])
+    # 转换为Pyecharts数据格式（[日, 时, 温度]，按网格行优先排列）
+    cells = grid_cells(Z, days, hours)
+    data = series_data(
+        cells,
+        decimals=final_config.get("value_decimals", 1),
+        raw_threshold=final_config.get("raw_json_threshold", RAW_JSON_THRESHOLD)
+    ) if uses_series(final_config) else []
 
     # 创建3D曲面图
     surface = Surface3D(init_opts=opts.InitOpts(
@@ -60,7 +88,7 @@ def create_pye_3dsurface(
             name=final_config["xaxis_name"],
             type_="value",
             min_=1,
-            max_=366,
+            max_=x_max,
             splitline_opts=opts.SplitLineOpts(is_show=False)
         ),
         yaxis3d_opts=opts.Axis3DOpts(
@@ -77,6 +105,9 @@ def create_pye_3dsurface(
         ),
     )
 
+    # dataset/sidecar模式（3D曲面系列不支持dataset，数据按行数组写入系列或sidecar）
+    sidecars = attach_data(surface, dict(zip(("day", "hour", "value"), cells)), None, final_config, output_file)
+
     surface.set_global_opts(
         title_opts=opts.TitleOpts(
             title=final_config["title"],
@@ -100,17 +131,9 @@ def create_pye_3dsurface(
     )
 
     # 保存输出
-    if final_config["output_path"]:
-        surface.render(f"{final_config['output_path']}/{final_config['filename']}.html")
+    if output_file:
+        render_chart(surface, output_file, sidecars)
+        record.outputs.extend(sidecars)
+        record.store()
 
     return surface
-
-
-def _prepare_pye3d_data(df, date_col, year):
-    """准备Pyecharts 3D数据"""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df[df[date_col].dt.year == year]
-    df['day_of_year'] = df[date_col].dt.dayofyear
-    df['hour'] = df[date_col].dt.hour
-    return df.sort_values(['day_of_year', 'hour'])
@@ -0,0 +1,73 @@
+# src/registry.py
+"""
+图表注册表
+按名称登记全部create_*函数所在的模块，图表被请求时才导入对应模块与绘图引擎（matplotlib或pyecharts），
+导入main.py或只渲染一个图表时不再加载全部十个图表模块
+"""
+import importlib
+from typing import Callable, List, NamedTuple, Optional
+
+
+class ChartSpec(NamedTuple):
+    """
+    图表登记信息
+
+    属性：
+    engine : 绘图引擎（matplot/pyecharts）
+    module : 定义create_*函数的模块
+    data : 默认输入（cube为预聚合立方，daily为逐日均值表，frame为完整数据框，index为时间索引）
+    default_config : pyecharts图表的默认配置名（用于推算输出文件；matplotlib图表直接返回路径）
+    """
+    engine: str
+    module: str
+    data: str
+    default_config: Optional[str] = None
+
+
+CHARTS = {
+    "create_area_plot": ChartSpec("matplot", "src.matplot.area_plot", "daily"),
+    "create_box_plot": ChartSpec("matplot", "src.matplot.box_plot", "cube"),
+    "create_calendar_heatmap": ChartSpec("matplot", "src.matplot.calendar_hearmap", "cube"),
+    "create_heatmap": ChartSpec("matplot", "src.matplot.heatmap", "cube"),
+    "create_line_plot": ChartSpec("matplot", "src.matplot.line_plot", "daily"),
+    "create_3d_surface": ChartSpec("matplot", "src.matplot.surface_3d", "cube"),
+    "create_pye_calendar": ChartSpec("pyecharts", "src.pyeplot.calendar_heatmap", "cube", "PYE_CALENDAR_CONFIG"),
+    "create_pye_heatmap": ChartSpec("pyecharts", "src.pyeplot.heatmap", "cube", "PYE_HEATMAP_CONFIG"),
+    "create_pye_line": ChartSpec("pyecharts", "src.pyeplot.line_charts", "frame", "PYE_LINE_CONFIG"),
+    "create_pye_3dsurface": ChartSpec("pyecharts", "src.pyeplot.surface_3d", "cube", "PYE_3DSURFACE_CONFIG"),
+}
+
+
+def load_chart(name: str) -> Callable:
+    """
+    导入并返回图表函数（模块只在首次请求时导入）
+
+    参数：
+    name : create_*函数名（见CHARTS）
+    """
+    if name not in CHARTS:
+        raise ValueError(f"未知图表: {name}，可选: {', '.join(CHARTS)}")
+    return getattr(importlib.import_module(CHARTS[name].module), name)
+
+
+def resolve_chart(name: str) -> str:
+    """
+    把图表名称规范为CHARTS中的键（可省略create_前缀）
+
+    参数：
+    name : create_*函数名或简称（如heatmap/pye_heatmap）
+    """
+    for candidate in (name, f"create_{name}"):
+        if candidate in CHARTS:
+            return candidate
+    raise ValueError(f"未知图表: {name}，可选: {', '.join(CHARTS)}")
+
+
+def chart_names(engine: Optional[str] = None) -> List[str]:
+    """
+    已登记的图表名称
+
+    参数：
+    engine : 只返回指定引擎的图表（默认全部）
+    """
+    return [name for name, spec in CHARTS.items() if engine is None or spec.engine == engine]
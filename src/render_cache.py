@@ -0,0 +1,278 @@
+# src/render_cache.py
+"""
+内容寻址的输出缓存
+每次渲染以（图表名、输入数据指纹、合并后的完整配置与其他参数、代码版本）的哈希为键，
+渲染完成后在缓存目录记录该键对应的输出文件（大小与修改时间）和耗时；
+再次请求同一个键且输出文件未被改动时直接跳过渲染。
+数据集加载的数据框（见register_frame）以数据版本为指纹，不读取数据；其他数据框按块计算内容哈希
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from src.config_resolver import FrozenConfig
+from src.time_index import BLOCK_ROWS
+
+# 参与代码版本计算的目录（相对项目根目录）
+CODE_DIRS = ("src", "config")
+
+# 当前线程已完成的缓存查询（批量渲染时写入清单）
+_EVENTS = threading.local()
+
+# 已登记的数据框（按各列底层数组识别）对应的版本标识；数据框释放时自动移除
+_FRAME_TAGS: Dict[tuple, str] = {}
+_FRAME_TAGS_LOCK = threading.Lock()
+
+
+class RenderRecord:
+    """
+    一次渲染的缓存记录
+
+    属性：
+    chart : 图表名称
+    key : 缓存键（未启用缓存时为None）
+    outputs : 输出文件列表（渲染时额外写出的文件可在store()前追加）
+    fresh : 输出文件是否与缓存键一致（为True时可跳过渲染）
+    """
+
+    def __init__(self, chart: str, key: Optional[str], outputs: List[str]):
+        self.chart = chart
+        self.key = key
+        self.outputs = outputs
+        self.fresh = key is not None and _is_fresh(key, outputs)
+        self._started = time.perf_counter()
+        if self.fresh:
+            _event(chart, key, "hit", 0.0)
+
+    @property
+    def output(self) -> Optional[str]:
+        """第一个输出文件"""
+        return self.outputs[0] if self.outputs else None
+
+    def store(self) -> None:
+        """渲染完成后记录输出文件与耗时（未启用缓存时不做任何事）"""
+        if self.key is None:
+            return
+        seconds = round(time.perf_counter() - self._started, 3)
+        outputs = [o for o in self.outputs if os.path.exists(o)]
+        record = {
+            "chart": self.chart,
+            "key": self.key,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "seconds": seconds,
+            "outputs": [_file_state(output) for output in outputs]
+        }
+        path = _record_path(self.key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        _event(self.chart, self.key, "miss", seconds)
+
+
+def lookup_render(
+        chart: str,
+        config: Mapping,
+        data: Any,
+        outputs: Sequence[Optional[str]],
+        enabled: bool = True,
+        **params) -> RenderRecord:
+    """
+    查询输出缓存
+
+    参数：
+    chart : 图表名称（create_*函数名）
+    config : 合并后的完整配置
+    data : 图表输入（数据框、时间索引或预聚合立方）
+    outputs : 本次渲染将写出的文件（为空或包含None时不缓存）
+    enabled : 是否启用缓存（交互显示、返回Figure等不写文件的调用应传False）
+    params : 其他影响输出的参数（如时间粒度、年份、列名）
+    返回：缓存记录，fresh为True时输出文件已是最新
+    """
+    outputs = list(outputs)
+    if not enabled or not outputs or any(output is None for output in outputs):
+        return RenderRecord(chart, None, [o for o in outputs if o])
+    return RenderRecord(chart, render_key(chart, config, data, **params), outputs)
+
+
+def render_key(chart: str, config: Mapping, data: Any, **params) -> str:
+    """
+    计算缓存键
+
+    参数：
+    chart : 图表名称
+    config : 合并后的完整配置（FrozenConfig直接使用其内容哈希）
+    data : 图表输入
+    params : 其他影响输出的参数
+    """
+    if isinstance(config, FrozenConfig):
+        config = config.digest
+    payload = json.dumps(
+        {"chart": chart, "config": config, "params": params, "data": data_fingerprint(data), "code": code_version()},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=_json_default
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def data_fingerprint(data: Any) -> str:
+    """
+    图表输入的内容指纹
+
+    参数：
+    data : 预聚合立方（使用其内容哈希）、时间索引、数据框或None
+    """
+    if data is None:
+        return "none"
+    fingerprint = getattr(data, "fingerprint", None)
+    if isinstance(fingerprint, str):
+        return fingerprint
+    frame = getattr(data, "frame", data)
+    if isinstance(frame, pd.DataFrame):
+        signature = _frame_signature(frame)
+        with _FRAME_TAGS_LOCK:
+            tag = _FRAME_TAGS.get(signature)
+        return tag if tag is not None else _frame_digest(frame)
+    raise TypeError(f"无法计算输入数据的指纹: {type(data).__name__}")
+
+
+def register_frame(frame: pd.DataFrame, tag: str) -> None:
+    """
+    登记只读数据框的版本标识
+    之后共享同一组底层数组的数据框（浅拷贝、时间索引）直接以该标识为指纹；
+    切片、新增或替换列后底层数组不同，仍按内容计算
+
+    参数：
+    frame : 各列只读的数据框（如TemperatureDataset加载的数据）
+    tag : 数据版本标识（数据内容变化时必须不同）
+    """
+    signature = _frame_signature(frame)
+    with _FRAME_TAGS_LOCK:
+        _FRAME_TAGS[signature] = tag
+    # 数据框释放后其底层内存可能被复用，登记随之失效
+    weakref.finalize(frame, _forget_frame, signature, tag)
+
+
+def _forget_frame(signature: tuple, tag: str) -> None:
+    with _FRAME_TAGS_LOCK:
+        if _FRAME_TAGS.get(signature) == tag:
+            del _FRAME_TAGS[signature]
+
+
+def _frame_signature(frame: pd.DataFrame) -> tuple:
+    """数据框的结构标识：各列名称、类型与底层数组的地址、形状和步长（不读取数据）"""
+    signature = [len(frame)]
+    for col in frame.columns:
+        values = frame[col].array
+        if isinstance(values, pd.Categorical):
+            signature.append((col, "category", tuple(values.categories)) + _array_signature(values.codes))
+        else:
+            signature.append((col, str(values.dtype)) + _array_signature(np.asarray(values)))
+    return tuple(signature)
+
+
+def _array_signature(values: np.ndarray) -> Tuple[int, tuple, tuple]:
+    return values.__array_interface__["data"][0], values.shape, values.strides
+
+
+def _frame_digest(frame: pd.DataFrame) -> str:
+    """按BLOCK_ROWS行分块计算数据框的内容哈希（数值列直接哈希原始字节，中间数组只按块分配）"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(col, str(frame[col].dtype)) for col in frame.columns]).encode("utf-8"))
+    for col in frame.columns:
+        values = frame[col].array
+        if isinstance(values, pd.Categorical):
+            digest.update(repr(list(values.categories)).encode("utf-8"))
+            values = values.codes
+        else:
+            values = np.asarray(values)
+        for start in range(0, len(frame), BLOCK_ROWS):
+            block = values[start:start + BLOCK_ROWS]
+            if block.dtype.kind in "biufcmM":
+                digest.update(np.ascontiguousarray(block).view(np.uint8))
+            else:
+                digest.update(pd.util.hash_array(block).view(np.uint8))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """代码版本：src与config下全部Python源文件的内容哈希（每个进程只计算一次）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for directory in CODE_DIRS:
+        root = os.path.join(settings.BASE_DIR, directory)
+        for folder, dirs, files in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if not name.endswith(".py"):
+                    continue
+                path = os.path.join(folder, name)
+                digest.update(os.path.relpath(path, settings.BASE_DIR).encode("utf-8"))
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def take_events() -> List[dict]:
+    """取出当前线程记录的缓存查询结果（chart/key/status/seconds）"""
+    events = getattr(_EVENTS, "items", [])
+    _EVENTS.items = []
+    return events
+
+
+def _event(chart: str, key: str, status: str, seconds: float) -> None:
+    if not hasattr(_EVENTS, "items"):
+        _EVENTS.items = []
+    _EVENTS.items.append({"chart": chart, "key": key, "status": status, "seconds": seconds})
+
+
+def _json_default(value: Any):
+    """配置中非JSON类型的值（numpy标量/数组、pyecharts对象等）转为可哈希的稳定表示"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, "__dict__"):
+        return [type(value).__name__, vars(value)]
+    return repr(value)
+
+
+def _record_path(key: str) -> str:
+    return os.path.join(settings.RENDER_CACHE_DIR, f"{key}.json")
+
+
+def _file_state(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _is_fresh(key: str, outputs: List[str]) -> bool:
+    """缓存记录存在，且本次的输出文件与渲染时一并写出的其他文件（如sidecar数据）都还在、未被其他渲染覆盖"""
+    try:
+        with open(_record_path(key), encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return False
+    recorded = {item["path"]: item for item in record.get("outputs", [])}
+    if any(os.path.abspath(output) not in recorded for output in outputs):
+        return False
+    for path, item in recorded.items():
+        try:
+            if _file_state(path) != item:
+                return False
+        except OSError:
+            return False
+    return True
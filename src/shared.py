@@ -0,0 +1,194 @@
+# src/shared.py
+"""
+共享内存数据集
+主进程把已加载的数据框各列（未加载时不共享）与预聚合立方的大数组各复制一次到multiprocessing.shared_memory，
+渲染工作进程按名称附加这些内存块并直接构造只读数组，不再各自解析或反序列化整份数据；
+直接由列式目录内存映射的列不复制，工作进程按路径以load_columnar(mmap=True)映射同一批文件（由操作系统页缓存共享）；
+工作进程数量增加时不会增加数据副本
+"""
+import copy
+import pickle
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import DataSelection, TemperatureDataset, register_dataset
+from src.dtypes import memory_report
+from src.storage import is_columnar, load_columnar, read_meta
+
+
+class SharedArray(NamedTuple):
+    """共享内存中的数组描述（可跨进程传递）"""
+    shm_name: str
+    dtype: str
+    shape: Tuple[int, ...]
+
+
+class SharedDatasetHandle(NamedTuple):
+    """
+    共享数据集描述，只包含内存块名称与少量元数据，传给工作进程的开销与数据规模无关
+
+    属性：
+    path / time_col : 数据集路径与时间列
+    version / stat_key : 数据版本（工作进程据此判断文件是否已变化）
+    columns : 列名到(存储方式, 共享数组, 附加信息)的映射（主进程未加载数据框时为None；
+              存储方式为mapped的列不在共享内存中，工作进程从path内存映射）
+    cubes : 立方缓存键到(去掉大数组的立方, 共享数组字典)的映射
+    selection : 数据集的筛选条件
+    digest : 主进程已计算的内容哈希（未计算时为None）
+    """
+    path: str
+    time_col: str
+    version: str
+    stat_key: tuple
+    columns: Optional[Dict[str, Tuple[str, Optional[SharedArray], Any]]]
+    cubes: Dict[tuple, Tuple[bytes, Dict[str, SharedArray]]]
+    selection: Optional[DataSelection] = None
+    digest: Optional[str] = None
+
+
+# 立方中放入共享内存的大数组
+CUBE_ARRAYS = ("hourly_sum", "hourly_count")
+
+# 工作进程中已附加的内存块（保持引用，避免数组底层缓冲区被释放）
+_ATTACHED: List[shared_memory.SharedMemory] = []
+
+
+class SharedDataset:
+    """
+    主进程发布的共享数据集（上下文管理器，退出时释放全部内存块）
+
+    参数：
+    dataset : 已加载的数据集上下文
+    """
+
+    def __init__(self, dataset: TemperatureDataset):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        version, stat_key = dataset.version
+
+        columns = None
+        if dataset.frame_loaded:
+            columns = self._share_frame(dataset.frame, dataset.path)
+
+        cubes = {}
+        for key, cube in dataset.cached_cubes().items():
+            skeleton = copy.copy(cube)
+            arrays = {}
+            for name in CUBE_ARRAYS:
+                arrays[name] = self._share(getattr(cube, name))
+                setattr(skeleton, name, None)
+            cubes[key] = (pickle.dumps(skeleton), arrays)
+
+        self.handle = SharedDatasetHandle(
+            path=dataset.path,
+            time_col=dataset.time_col,
+            version=version,
+            digest=dataset.computed_fingerprint,
+            stat_key=stat_key,
+            columns=columns,
+            cubes=cubes,
+            selection=dataset.selection
+        )
+
+    def close(self) -> None:
+        """释放全部内存块（所有工作进程结束后调用）"""
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _share_frame(self, frame: pd.DataFrame, path: str) -> Dict[str, Tuple[str, Optional[SharedArray], Any]]:
+        """把数据框各列复制到共享内存（直接引用列式目录内存映射的列除外）"""
+        mapped = set()
+        if is_columnar(path) and read_meta(path)["rows"] == len(frame):
+            # 行数与存储一致且仍为内存映射的列就是存储中的原始列（筛选、排序或类型转换都会产生拷贝）
+            report = memory_report(frame)
+            mapped = {col for col in frame.columns if report.loc[col, "mmap"]}
+
+        columns = {}
+        for col in frame.columns:
+            values = frame[col].array
+            if col in mapped:
+                columns[col] = ("mapped", None, None)
+            elif isinstance(values, pd.Categorical):
+                columns[col] = ("category", self._share(values.codes), list(values.categories))
+            elif pd.api.types.is_datetime64_dtype(values.dtype):
+                array = np.asarray(values)
+                columns[col] = ("datetime", self._share(array.view(np.int64)), str(array.dtype))
+            elif isinstance(values, np.ndarray) or pd.api.types.is_numeric_dtype(values.dtype):
+                columns[col] = ("numeric", self._share(np.asarray(values)), None)
+            else:
+                # 无法零拷贝共享的列（如未转换为分类类型的字符串列）随描述序列化
+                columns[col] = ("pickle", None, pickle.dumps(values))
+        return columns
+
+    def _share(self, array: np.ndarray) -> SharedArray:
+        """把数组复制到新的内存块"""
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return SharedArray(block.name, array.dtype.str, array.shape)
+
+
+def attach_dataset(handle: SharedDatasetHandle) -> TemperatureDataset:
+    """
+    在工作进程中附加共享数据集并注册为该路径的共享上下文
+    之后get_dataset()/load_dataset()/cube()直接返回共享内存上的只读数据
+
+    参数：
+    handle : 主进程发布的共享数据集描述
+    """
+    frame = None
+    if handle.columns is not None:
+        frame = _attach_frame(handle.columns, handle.path)
+
+    cubes = {}
+    for key, (skeleton, arrays) in handle.cubes.items():
+        cube = pickle.loads(skeleton)
+        for name, shared in arrays.items():
+            setattr(cube, name, _attach(shared))
+        cubes[key] = cube
+
+    dataset = TemperatureDataset(handle.path, time_col=handle.time_col, selection=handle.selection)
+    dataset.preload(frame, handle.version, handle.stat_key, cubes, handle.digest)
+    register_dataset(dataset)
+    return dataset
+
+
+def _attach_frame(shared_columns: Dict[str, Tuple[str, Optional[SharedArray], Any]], path: str) -> pd.DataFrame:
+    """由共享列描述重建只读数据框（mapped列从列式目录只读内存映射）"""
+    store = None
+    columns = {}
+    for col, (kind, shared, extra) in shared_columns.items():
+        if kind == "mapped":
+            if store is None:
+                store = load_columnar(path, mmap=True)
+            columns[col] = store[col].array
+        elif kind == "category":
+            columns[col] = pd.Categorical.from_codes(_attach(shared), categories=extra)
+        elif kind == "datetime":
+            columns[col] = _attach(shared).view(extra)
+        elif kind == "numeric":
+            columns[col] = _attach(shared)
+        else:
+            columns[col] = pickle.loads(extra)
+    return pd.DataFrame(columns, copy=False)
+
+
+def _attach(shared: SharedArray) -> np.ndarray:
+    """按名称附加内存块并构造只读数组（不复制数据）"""
+    # 工作进程与主进程共用同一个资源跟踪器，重复登记不影响由主进程统一释放
+    block = shared_memory.SharedMemory(name=shared.shm_name)
+    _ATTACHED.append(block)
+    array = np.ndarray(shared.shape, dtype=np.dtype(shared.dtype), buffer=block.buf)
+    array.flags.writeable = False
+    return array
@@ -0,0 +1,201 @@
+# src/storage.py
+"""
+列式二进制存储
+每列保存为一个.npy文件：时间列为int64纳秒时间戳，温度列为float32，
+字符串列（如站点编号）保存为整数编码；读取时使用内存映射，避免重复解析文本时间戳。
+并行生成时各进程直接写入同一个预分配目录的不同行范围，结果仍是单个可内存映射的列式目录
+"""
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+META_FILE = "_meta.json"
+FORMAT_VERSION = 1
+
+
+def is_columnar(path: str) -> bool:
+    """判断路径是否为列式数据目录"""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+
+class ColumnarWriter:
+    """
+    列式目录的分块写入器
+    按总行数预分配每列的.npy文件，再以内存映射方式逐块填充，
+    写入任意规模的数据时内存占用只与单块大小有关
+
+    参数：
+    path : 输出目录
+    rows : 总行数
+    schema : 列名到存储类型的映射（datetime64[ns]/category/numpy数值类型）
+    time_col : 时间列名称（默认'timestamp'）
+    categories : category列的取值列表
+    mode : w+新建并预分配（关闭时写入元数据）；r+打开已预分配的文件，只写入数据
+           （并行写入时由主进程以w+预分配，各工作进程以r+写入各自的行范围）
+    """
+
+    def __init__(
+            self,
+            path: str,
+            rows: int,
+            schema: Dict[str, str],
+            time_col: str = "timestamp",
+            categories: Optional[Dict[str, list]] = None,
+            mode: str = "w+"):
+        if mode not in ("w+", "r+"):
+            raise ValueError("mode参数必须是w+/r+")
+        self.path = path
+        self.rows = rows
+        self.schema = dict(schema)
+        self.time_col = time_col
+        self.categories = {col: list(values) for col, values in (categories or {}).items()}
+        self.mode = mode
+        os.makedirs(path, exist_ok=True)
+
+        self._arrays = {}
+        for col, kind in self.schema.items():
+            if kind == "category" and col not in self.categories:
+                raise ValueError(f"category列{col}缺少取值列表")
+            self._arrays[col] = np.lib.format.open_memmap(
+                os.path.join(path, f"{col}.npy"),
+                mode=mode,
+                dtype=_storage_dtype(kind, self.categories.get(col)),
+                shape=(rows,)
+            )
+
+    def write(self, start: int, df: pd.DataFrame) -> None:
+        """将数据块写入[start, start+len(df))行"""
+        stop = start + len(df)
+        if stop > self.rows:
+            raise ValueError(f"写入范围超出预分配行数：{stop} > {self.rows}")
+        for col, kind in self.schema.items():
+            values = df[col]
+            if kind == "datetime64[ns]":
+                array = pd.to_datetime(values).to_numpy(dtype="datetime64[ns]").view("int64")
+            elif kind == "category":
+                array = pd.Categorical(values, categories=self.categories[col]).codes
+            else:
+                array = values.to_numpy(dtype=kind)
+            self._arrays[col][start:stop] = array
+
+    def close(self) -> None:
+        """刷新数据并写入元数据（r+模式只刷新数据）"""
+        for array in self._arrays.values():
+            array.flush()
+        self._arrays = {}
+        if self.mode != "w+":
+            return
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "time_col": self.time_col,
+            "rows": self.rows,
+            "columns": self.schema,
+            "categories": self.categories
+        }
+        with open(os.path.join(self.path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def save_columnar(
+        df: pd.DataFrame,
+        path: str,
+        time_col: str = "timestamp",
+        float_dtype: str = "float32") -> None:
+    """
+    将数据框保存为列式目录
+
+    参数：
+    df : 待保存的数据框
+    path : 输出目录
+    time_col : 时间列名称（默认'timestamp'）
+    float_dtype : 浮点列的存储精度（默认float32）
+    """
+    schema = {}
+    categories = {}
+    for col in df.columns:
+        values = df[col]
+        if col == time_col:
+            schema[col] = "datetime64[ns]"
+        elif pd.api.types.is_float_dtype(values):
+            schema[col] = float_dtype
+        elif pd.api.types.is_numeric_dtype(values):
+            schema[col] = str(values.dtype)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            schema[col] = "category"
+            categories[col] = [str(v) for v in values.cat.categories]
+        else:
+            schema[col] = "category"
+            categories[col] = [str(v) for v in pd.Categorical(values.astype(str)).categories]
+
+    with ColumnarWriter(path, len(df), schema, time_col, categories) as writer:
+        writer.write(0, df)
+
+
+def load_columnar(path: str, mmap: bool = True) -> pd.DataFrame:
+    """
+    读取列式目录
+
+    参数：
+    path : 列式数据目录
+    mmap : 是否以只读内存映射方式加载（默认True）
+    返回：各列直接引用.npy数据的数据框
+    """
+    meta = read_meta(path)
+    mmap_mode = "r" if mmap else None
+    columns = {}
+    for col, kind in meta["columns"].items():
+        array = np.load(os.path.join(path, f"{col}.npy"), mmap_mode=mmap_mode)
+        if kind == "datetime64[ns]":
+            array = array.view("datetime64[ns]")
+        elif kind == "category":
+            array = pd.Categorical.from_codes(array, categories=meta["categories"][col])
+        columns[col] = array
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_meta(path: str) -> dict:
+    """读取列式目录的元数据"""
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"不支持的列式存储版本：{meta.get('format_version')}")
+    return meta
+
+
+def data_files(path: str) -> list:
+    """返回数据路径对应的全部文件（列式目录按文件名排序）"""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if os.path.isfile(os.path.join(path, name))
+    )
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """根据路径推断存储格式（csv/columnar）"""
+    if fmt:
+        if fmt not in ("csv", "columnar"):
+            raise ValueError("fmt参数必须是csv/columnar")
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "columnar"
+
+
+def _storage_dtype(kind: str, categories: Optional[list] = None) -> np.dtype:
+    """存储类型对应的numpy数组类型"""
+    if kind == "datetime64[ns]":
+        return np.dtype("int64")
+    if kind == "category":
+        return np.dtype("int16") if len(categories) < np.iinfo(np.int16).max else np.dtype("int32")
+    return np.dtype(kind)
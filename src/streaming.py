@@ -0,0 +1,276 @@
+# src/streaming.py
+"""
+分块流式摄取
+按块读取任意规模的数据文件，逐块累加小时×日求和/计数、逐日极值与均值、逐月及分组直方图，
+最终生成与AggregationCube.build结构相同的聚合立方，内存占用只与块大小和时间跨度有关；
+分位数与箱线图统计量由固定宽度直方图估计（精度为半个分箱宽度）
+"""
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.aggregation import (
+    BOX_GROUPS, DAYS_PER_YEAR, DAY_NS, AggregationCube, _group_table, hourly_grid
+)
+from src.storage import is_columnar, load_columnar
+from src.time_index import TimeIndex, as_time_index
+
+# 直方图默认范围与分箱宽度（℃），超出范围的值计入两端分箱
+HIST_RANGE = (-80.0, 80.0)
+HIST_BIN_WIDTH = 0.05
+# 箱线图分组的取值范围
+GROUP_SIZES = {"month": 13, "day": 32, "hour": 24}
+
+
+class StreamingAggregator:
+    """
+    流式聚合器
+
+    参数：
+    time_col : 时间列名称（默认'timestamp'）
+    value_col : 数值列名称（默认'temperature'）
+    hist_range : 直方图范围
+    bin_width : 直方图分箱宽度
+    """
+
+    def __init__(
+            self,
+            time_col: str = "timestamp",
+            value_col: str = "temperature",
+            hist_range: Tuple[float, float] = HIST_RANGE,
+            bin_width: float = HIST_BIN_WIDTH):
+        self.time_col = time_col
+        self.value_col = value_col
+        self.hist_low = hist_range[0]
+        self.bin_width = bin_width
+        self.n_bins = int(np.ceil((hist_range[1] - hist_range[0]) / bin_width))
+
+        self._hourly: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._daily: Optional[pd.DataFrame] = None
+        self._monthly: Optional[pd.DataFrame] = None
+        self._monthly_hist: Dict[int, np.ndarray] = {}
+        self._groups = {
+            group_by: {
+                "hist": np.zeros((size, self.n_bins), dtype=np.int64),
+                "sum": np.zeros(size),
+                "min": np.full(size, np.inf),
+                "max": np.full(size, -np.inf)
+            }
+            for group_by, size in GROUP_SIZES.items()
+        }
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """累加一个数据块"""
+        if len(chunk) == 0:
+            return
+        index = as_time_index(chunk, self.time_col, (self.value_col,))
+        values = index[self.value_col].to_numpy().astype(np.float64, copy=False)
+        valid = ~np.isnan(values)
+        bins = np.clip(((values - self.hist_low) // self.bin_width), 0, self.n_bins - 1)
+        bins = np.where(valid, bins, 0).astype(np.int64)
+
+        self._update_hourly(index)
+        self._update_daily(index, values)
+        self._update_monthly(index, values, valid, bins)
+        for group_by in BOX_GROUPS:
+            self._update_group(group_by, index.field(group_by)[valid], values[valid], bins[valid])
+
+    def finalize(self) -> AggregationCube:
+        """生成聚合立方"""
+        if self._daily is None:
+            raise ValueError("没有读取到任何数据")
+
+        years = np.arange(min(self._hourly), max(self._hourly) + 1)
+        shape = (len(years), 24, DAYS_PER_YEAR)
+        hourly_sum = np.zeros(shape)
+        hourly_count = np.zeros(shape, dtype=np.int32)
+        for i, year in enumerate(years):
+            if year in self._hourly:
+                hourly_sum[i], hourly_count[i] = self._hourly[year]
+
+        return AggregationCube(
+            years=years,
+            hourly_sum=hourly_sum,
+            hourly_count=hourly_count,
+            daily=self._finalize_daily(),
+            monthly=self._finalize_monthly(),
+            boxes={group_by: self._finalize_group(group_by) for group_by in BOX_GROUPS},
+            time_col=self.time_col,
+            value_col=self.value_col
+        )
+
+    def _update_hourly(self, index: TimeIndex) -> None:
+        """累加(年, 小时, 天)网格"""
+        years, sums, counts = hourly_grid(index, self.value_col)
+        for year, year_sum, year_count in zip(years, sums, counts):
+            if not year_count.any():
+                continue
+            if year in self._hourly:
+                total_sum, total_count = self._hourly[year]
+                total_sum += year_sum
+                total_count += year_count
+            else:
+                self._hourly[int(year)] = (year_sum, year_count)
+
+    def _update_daily(self, index: TimeIndex, values: np.ndarray) -> None:
+        """累加逐日sum/count/min/max（以1970-01-01起的天序号为键）"""
+        codes = index.ns // DAY_NS
+        first_day = int(codes[0])
+        codes -= first_day
+        table = _group_table(codes, values, int(codes[-1]) + 1).drop(columns="mean")
+        table.index = table.index + first_day
+        self._daily = _merge_tables(self._daily, table[table["count"] > 0])
+
+    def _update_monthly(self, index: TimeIndex, values: np.ndarray, valid: np.ndarray, bins: np.ndarray) -> None:
+        """累加逐月sum/count/min/max与直方图（以年*12+月-1为键）"""
+        months = index.field("year").astype(np.int64) * 12 + index.field("month") - 1
+        first_month = int(months[0])
+        codes = months - first_month
+        n_groups = int(codes[-1]) + 1
+        table = _group_table(codes, values, n_groups).drop(columns="mean")
+        table.index = table.index + first_month
+        self._monthly = _merge_tables(self._monthly, table[table["count"] > 0])
+
+        hist = np.bincount(codes[valid] * self.n_bins + bins[valid], minlength=n_groups * self.n_bins)
+        for code, counts in enumerate(hist.reshape(n_groups, self.n_bins)):
+            if counts.any():
+                key = first_month + code
+                if key in self._monthly_hist:
+                    self._monthly_hist[key] += counts
+                else:
+                    self._monthly_hist[key] = counts
+
+    def _update_group(self, group_by: str, codes: np.ndarray, values: np.ndarray, bins: np.ndarray) -> None:
+        """累加箱线图分组的直方图与极值"""
+        state = self._groups[group_by]
+        size = len(state["sum"])
+        codes = codes.astype(np.int64)
+        state["hist"] += np.bincount(codes * self.n_bins + bins, minlength=size * self.n_bins).reshape(size, -1)
+        state["sum"] += np.bincount(codes, weights=values, minlength=size)
+        np.fmin.at(state["min"], codes, values)
+        np.fmax.at(state["max"], codes, values)
+
+    def _finalize_daily(self) -> pd.DataFrame:
+        """补齐缺测日并计算均值"""
+        days = np.arange(self._daily.index.min(), self._daily.index.max() + 1)
+        table = self._daily.reindex(days)
+        table["count"] = table["count"].fillna(0).astype(np.int64)
+        table["sum"] = table["sum"].fillna(0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table["mean"] = table["sum"] / table["count"]
+        table = table[["sum", "count", "mean", "min", "max"]]
+        table.index = pd.date_range(
+            pd.Timestamp(int(days[0]) * DAY_NS), periods=len(days), freq="D", name=self.time_col
+        )
+        return table
+
+    def _finalize_monthly(self) -> pd.DataFrame:
+        """补齐缺测月并由直方图估计四分位数"""
+        months = np.arange(self._monthly.index.min(), self._monthly.index.max() + 1)
+        table = self._monthly.reindex(months)
+        table["count"] = table["count"].fillna(0).astype(np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table["mean"] = table["sum"] / table["count"]
+
+        quantiles = np.full((len(months), 3), np.nan)
+        for i, month in enumerate(months):
+            if month in self._monthly_hist:
+                quantiles[i] = self._hist_quantiles(self._monthly_hist[month], [0.25, 0.5, 0.75])
+        table["q25"], table["q50"], table["q75"] = quantiles.T
+        table = table[["count", "mean", "min", "max", "q25", "q50", "q75"]]
+        first = pd.Timestamp(year=int(months[0]) // 12, month=int(months[0]) % 12 + 1, day=1)
+        table.index = pd.date_range(first, periods=len(months), freq="MS", name=self.time_col)
+        return table
+
+    def _finalize_group(self, group_by: str) -> List[dict]:
+        """由直方图估计箱线图统计量（格式与matplotlib.cbook.boxplot_stats一致）"""
+        state = self._groups[group_by]
+        stats = []
+        for code, hist in enumerate(state["hist"]):
+            count = hist.sum()
+            if count == 0:
+                continue
+            q1, med, q3 = self._hist_quantiles(hist, [0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+            value_min, value_max = state["min"][code], state["max"][code]
+
+            centers = self.hist_low + (np.flatnonzero(hist) + 0.5) * self.bin_width
+            inside = centers[(centers >= low) & (centers <= high)]
+            whislo = value_min if value_min >= low else (inside.min() if len(inside) else q1)
+            whishi = value_max if value_max <= high else (inside.max() if len(inside) else q3)
+            fliers = np.clip(centers[(centers < low) | (centers > high)], value_min, value_max)
+
+            notch = 1.57 * iqr / np.sqrt(count)
+            stats.append({
+                "mean": state["sum"][code] / count,
+                "iqr": iqr,
+                "cilo": med - notch,
+                "cihi": med + notch,
+                "whishi": whishi,
+                "whislo": whislo,
+                "fliers": fliers,
+                "q1": q1,
+                "med": med,
+                "q3": q3
+            })
+        return stats
+
+    def _hist_quantiles(self, hist: np.ndarray, qs: List[float]) -> np.ndarray:
+        """在直方图累积分布上线性插值求分位数"""
+        cumulative = np.cumsum(hist)
+        total = cumulative[-1]
+        result = []
+        for q in qs:
+            target = q * total
+            b = int(np.searchsorted(cumulative, target, "left"))
+            before = cumulative[b - 1] if b > 0 else 0
+            fraction = (target - before) / hist[b] if hist[b] else 0.5
+            result.append(self.hist_low + (b + fraction) * self.bin_width)
+        return np.array(result)
+
+
+def iter_data_chunks(
+        path: str,
+        time_col: str = "timestamp",
+        chunk_rows: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """按块读取CSV文件或列式目录"""
+    if is_columnar(path):
+        frame = load_columnar(path, mmap=True)
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, parse_dates=[time_col])
+
+
+def stream_cube(
+        path: str,
+        time_col: str = "timestamp",
+        value_col: str = "temperature",
+        chunk_rows: int = 1_000_000,
+        select: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None) -> AggregationCube:
+    """
+    流式读取数据文件并生成聚合立方
+
+    参数：
+    path : CSV文件或列式目录
+    time_col : 时间列名称（默认'timestamp'）
+    value_col : 数值列名称（默认'temperature'）
+    chunk_rows : 每块行数（默认100万行）
+    select : 数据块筛选函数（可选，如按时间窗口/站点筛选）
+    """
+    aggregator = StreamingAggregator(time_col, value_col)
+    for chunk in iter_data_chunks(path, time_col, chunk_rows):
+        if select is not None:
+            chunk = select(chunk)
+        aggregator.update(chunk)
+    return aggregator.finalize()
+
+
+def _merge_tables(total: Optional[pd.DataFrame], table: pd.DataFrame) -> pd.DataFrame:
+    """按键合并sum/count/min/max统计表"""
+    if total is None:
+        return table
+    merged = pd.concat([total, table])
+    return merged.groupby(level=0).agg({"sum": "sum", "count": "sum", "min": "min", "max": "max"})
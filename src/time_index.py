@@ -0,0 +1,147 @@
+# src/time_index.py
+"""
+按时间排序的数据索引
+时间戳以int64纳秒保存并保持升序，年/月/任意时间窗口通过二分查找得到行切片（不拷贝数据）；
+小时、年内天序号、星期、ISO周、月份等日历字段只计算一次，切片之间共享（按类型策略使用int8/int16）；
+日历字段与整列聚合按BLOCK_ROWS行分块计算，中间数组只按块分配
+"""
+from typing import Dict, Iterator, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dtypes import calendar_dtype
+
+# 支持缓存的日历字段
+CALENDAR_FIELDS = ("year", "month", "day", "hour", "dayofyear", "weekday", "week")
+# 分块计算的行数
+BLOCK_ROWS = 1 << 18
+
+
+class TimeIndex:
+    """
+    时间索引数据视图
+
+    参数：
+    frame : 数据框（时间列需已按升序排列）
+    time_col : 时间列名称（默认'timestamp'）
+    """
+
+    def __init__(self, frame: pd.DataFrame, time_col: str = "timestamp", _fields: Optional[dict] = None):
+        self.frame = frame
+        self.time_col = time_col
+        self.ns = frame[time_col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        self._fields: Dict[str, np.ndarray] = _fields if _fields is not None else {}
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, col):
+        return self.frame[col]
+
+    @property
+    def columns(self) -> pd.Index:
+        return self.frame.columns
+
+    def field(self, name: str, cache: bool = True) -> np.ndarray:
+        """
+        返回日历字段数组（首次访问时计算并缓存）
+
+        参数：
+        name : 字段名称
+        cache : 是否缓存（只使用一次的字段传False，用完即释放；已缓存时总是直接返回）
+        """
+        if name in self._fields:
+            return self._fields[name]
+        if name not in CALENDAR_FIELDS:
+            raise ValueError(f"日历字段必须是{'/'.join(CALENDAR_FIELDS)}")
+        values = calendar_field(self.frame[self.time_col], name)
+        if cache:
+            self._fields[name] = values
+        return values
+
+    def blocks(self, size: int = BLOCK_ROWS) -> Iterator["TimeIndex"]:
+        """按行数依次产出切片（视图；块上新计算的日历字段随块释放，不缓存到本索引）"""
+        for start in range(0, len(self), size):
+            yield self.rows(start, min(start + size, len(self)))
+
+    def rows(self, start: int, stop: int) -> "TimeIndex":
+        """按行号切片，数据与已缓存字段均为视图"""
+        fields = {name: values[start:stop] for name, values in self._fields.items()}
+        return TimeIndex(self.frame.iloc[start:stop], self.time_col, fields)
+
+    def window(self, start=None, end=None) -> "TimeIndex":
+        """
+        时间窗口切片[start, end)
+
+        参数：
+        start : 起始时间（包含，None表示不限）
+        end : 结束时间（不包含，None表示不限）
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.ns, pd.Timestamp(start).value, "left"))
+        hi = len(self.ns) if end is None else int(np.searchsorted(self.ns, pd.Timestamp(end).value, "left"))
+        return self.rows(lo, max(lo, hi))
+
+    def year(self, year: int) -> "TimeIndex":
+        """指定年份的切片"""
+        return self.window(pd.Timestamp(year=year, month=1, day=1),
+                           pd.Timestamp(year=year + 1, month=1, day=1))
+
+    def month(self, year: int, month: int) -> "TimeIndex":
+        """指定年月的切片"""
+        start = pd.Timestamp(year=year, month=month, day=1)
+        return self.window(start, start + pd.offsets.MonthBegin(1))
+
+
+def calendar_field(timestamps: pd.Series, name: str) -> np.ndarray:
+    """计算单个日历字段（整数类型由settings.DTYPE_POLICY决定；按块写入结果数组，pandas返回的宽类型中间结果只按块分配）"""
+    dtype = calendar_dtype(name)
+    if dtype is None or len(timestamps) <= BLOCK_ROWS:
+        values = _field_values(timestamps, name)
+        return values if dtype is None else values.astype(dtype, copy=False)
+    values = np.empty(len(timestamps), dtype=dtype)
+    for start in range(0, len(timestamps), BLOCK_ROWS):
+        values[start:start + BLOCK_ROWS] = _field_values(timestamps.iloc[start:start + BLOCK_ROWS], name)
+    return values
+
+
+def _field_values(timestamps: pd.Series, name: str) -> np.ndarray:
+    if name == "week":
+        return timestamps.dt.isocalendar().week.to_numpy(dtype=np.int64)
+    return getattr(timestamps.dt, name).to_numpy()
+
+
+def as_time_index(
+        data: Union[pd.DataFrame, TimeIndex],
+        time_col: str = "timestamp",
+        columns: Optional[Sequence[str]] = None) -> TimeIndex:
+    """
+    将数据框包装为时间索引（已是TimeIndex时直接返回）
+    已排序的datetime64数据直接引用原数据框；时间列需要解析时只在浅拷贝上替换该列；
+    未排序时只重排时间列与columns指定的列，调用方的数据框始终不被修改
+
+    参数：
+    data : 数据框或时间索引
+    time_col : 时间列名称（默认'timestamp'）
+    columns : 需要保留的其他列（默认全部列，仅在需要重排时生效）
+    """
+    if isinstance(data, TimeIndex):
+        return data
+
+    timestamps = data[time_col]
+    parsed = not pd.api.types.is_datetime64_any_dtype(timestamps)
+    if parsed:
+        timestamps = pd.to_datetime(timestamps)
+
+    if not timestamps.is_monotonic_increasing:
+        order = np.argsort(timestamps.to_numpy(), kind="stable")
+        keep = [col for col in (data.columns if columns is None else columns) if col != time_col]
+        frame = pd.DataFrame({time_col: timestamps.to_numpy()[order]})
+        for col in keep:
+            frame[col] = data[col].array.take(order)
+    elif parsed:
+        frame = data.copy(deep=False)
+        frame[time_col] = timestamps
+    else:
+        frame = data
+    return TimeIndex(frame, time_col)
@@ -0,0 +1,9 @@
+# tests/conftest.py
+import os
+import sys
+
+import matplotlib
+
+# 测试从仓库根目录导入main/src/config，图表只渲染到文件
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+matplotlib.use("Agg")
@@ -0,0 +1,96 @@
+# tests/test_memory.py
+"""
+渲染全部图表时的峰值内存
+数据集本身只加载一次，各图表的数据准备与渲染不应再产生与数据量成比例的拷贝：
+时间跨度不变、站点数（数据行数）增加时，每个图表的额外峰值内存的增量不超过数据集增量的MAX_EXTRA_RATIO倍，
+即整体峰值约为数据集大小的1倍（另加与数据量无关的渲染开销）；
+启用输出缓存时（main.py的默认方式），缓存未命中与命中两轮同样满足该上限
+"""
+import gc
+import tracemalloc
+
+import pytest
+
+import main
+from config import settings
+from data.temperature import write_temperature_data
+from src.dataset import TemperatureDataset, register_dataset
+from src.time_index import BLOCK_ROWS
+
+# 额外峰值内存增量与数据集增量之比的上限
+MAX_EXTRA_RATIO = 0.25
+
+
+def run_suite(tmp_path, monkeypatch, stations, end="2024-07-02", traced=True, use_cache=False):
+    """
+    生成逐分钟数据并渲染全部图表
+
+    参数：
+    tmp_path : 数据与输出目录
+    monkeypatch : pytest的monkeypatch
+    stations : 站点数
+    end : 数据终点（起点为2024-01-01）
+    traced : 是否记录峰值内存
+    use_cache : 是否启用输出缓存（启用时从空缓存开始，每个图表再以命中缓存的方式渲染一次）
+    返回：(数据集行数, 数据集字节数, {步骤: 额外峰值字节数})
+    """
+    root = tmp_path / f"{end}_{stations}{'_cached' if use_cache else ''}"
+    data_path = str(root / "data")
+    write_temperature_data(data_path, "columnar", start="2024-01-01", end=end, freq="minute", stations=stations)
+    for name, value in (
+            ("DATA_PATH", data_path),
+            ("MATPLOT_OUTPUT", str(root / "matplotlib")),
+            ("PYECHARTS_OUTPUT", str(root / "pyecharts")),
+            ("CACHE_DIR", str(root / "cache")),
+            ("RENDER_CACHE_DIR", str(root / "cache" / "renders")),
+            ("SHOW_FIGURES", False)):
+        monkeypatch.setattr(settings, name, value)
+    settings.ensure_output_dirs()
+
+    dataset = TemperatureDataset(data_path)
+    register_dataset(dataset)
+    frame = dataset.frame
+    rows, size = len(frame), int(frame.memory_usage(deep=True).sum())
+    del frame
+
+    steps = [("prepare_data", lambda: main.prepare_data(list(main.GENERATORS)))]
+    steps += [(name, lambda func=func: func(use_cache=use_cache)) for name, func in main.GENERATORS.items()]
+    if use_cache:
+        steps += [(f"{name}（缓存命中）", func) for name, func in steps[1:]]
+    peaks = {}
+    if traced:
+        tracemalloc.start()
+    try:
+        for name, step in steps:
+            gc.collect()
+            if traced:
+                start = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            step()
+            if traced:
+                peaks[name] = tracemalloc.get_traced_memory()[1] - start
+    finally:
+        if traced:
+            tracemalloc.stop()
+    return rows, size, peaks
+
+
+@pytest.mark.parametrize("use_cache", [False, True], ids=["no_cache", "cache"])
+def test_suite_peak_memory_scales_with_dataset(tmp_path, monkeypatch, use_cache):
+    # 预热：字体、样式与模块级缓存只在首次渲染时分配
+    run_suite(tmp_path, monkeypatch, 1, end="2024-01-02", traced=False, use_cache=use_cache)
+    # 两组数据都超过一个分块（BLOCK_ROWS行），分块临时数组的大小相同
+    small_rows, small_size, small_peaks = run_suite(tmp_path, monkeypatch, 1, use_cache=use_cache)
+    _, large_size, large_peaks = run_suite(tmp_path, monkeypatch, 4, use_cache=use_cache)
+
+    assert small_rows >= BLOCK_ROWS
+    growth = large_size - small_size
+    for name, small_peak in small_peaks.items():
+        extra = large_peaks[name] - small_peak
+        assert extra <= MAX_EXTRA_RATIO * growth, (
+            f"{name}：数据集增加{growth / 1e6:.1f}MB，额外峰值内存增加{extra / 1e6:.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
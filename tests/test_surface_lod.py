@@ -0,0 +1,45 @@
+# tests/test_surface_lod.py
+"""
+跨年3D曲面的网格精度
+年份列表首尾相接为一个曲面，网格点超过max_points时自动合并天数，X轴覆盖全部年份
+"""
+import pytest
+
+from data.temperature import write_temperature_data
+from src.dataset import TemperatureDataset
+from src.pyeplot.surface_3d import create_pye_3dsurface
+
+YEARS = [2021, 2022, 2023, 2024]
+# 四年逐小时网格的单元格数
+SPAN_CELLS = (365 * 3 + 366) * 24
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("surface") / "data")
+    write_temperature_data(path, "columnar", start="2021-01-01", end="2025-01-01", freq="hour")
+    return TemperatureDataset(path)
+
+
+def surface_cells(surface):
+    return surface.options["series"][0]["data"]
+
+
+@pytest.mark.parametrize("max_points", [20000, 5000])
+def test_multi_year_surface_respects_max_points(dataset, max_points):
+    config = {"output_path": None, "max_points": max_points, "raw_json_threshold": SPAN_CELLS}
+    surface = create_pye_3dsurface(None, cube=dataset.cube(), year=YEARS, config=config)
+
+    cells = surface_cells(surface)
+    assert 0 < len(cells) <= max_points
+    assert {hour for _, hour, _ in cells} == set(range(24))
+    assert surface.options["xAxis3D"].opts["max"] == SPAN_CELLS // 24
+
+
+def test_multi_year_surface_without_limit_keeps_every_day(dataset):
+    config = {"output_path": None, "max_points": None, "raw_json_threshold": SPAN_CELLS}
+    from_cube = surface_cells(create_pye_3dsurface(None, cube=dataset.cube(), year=YEARS, config=config))
+    from_index = surface_cells(create_pye_3dsurface(dataset.index, year=YEARS, config=config))
+
+    assert len(from_cube) == SPAN_CELLS
+    assert from_cube == from_index